@@ -0,0 +1,90 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import List, Optional
+
+# Add the project root to the Python path to resolve local imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.logger import setup_logging
+from services.arbitrage_engine import ArbitrageEngine
+from services.backtest import Backtester, BacktestReport, snapshot_prices
+from services.route_engine import RouteEngine
+from services.snapshot_store import SnapshotReplaySource
+from data.metadata_loader import MetadataLoader
+from data.flip_loader import FlipLoader
+from database.db_manager import DatabaseManager
+from database.price_history import PriceHistoryStore
+from config.constants import BACKTEST_DEFAULT_DAYS, BACKTEST_TRAVEL_MINUTES, BACKTEST_MAX_FILL_WAIT_MINUTES, BACKTEST_REPORT_TOP
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backtest Albion Market Master trades over stored price history.")
+    parser.add_argument("--days", type=float, default=BACKTEST_DEFAULT_DAYS,
+                        help="How much of the stored price history to replay (default: %(default)s).")
+    parser.add_argument("--snapshots", nargs="+", metavar="PATH",
+                        help="Replay recorded snapshot files (oldest first) instead of the price history.")
+    parser.add_argument("--db", metavar="PATH", help="Database to read the price history from (default: market.db).")
+    parser.add_argument("--travel-minutes", type=float, default=BACKTEST_TRAVEL_MINUTES,
+                        help="Time between buying and arriving at the sell city (default: %(default)s).")
+    parser.add_argument("--max-wait-minutes", type=float, default=BACKTEST_MAX_FILL_WAIT_MINUTES,
+                        help="Give up on a sale this long after arriving (default: %(default)s).")
+    parser.add_argument("--non-premium", action="store_true", help="Use the non-premium sales tax.")
+    pairs = parser.add_mutually_exclusive_group()
+    pairs.add_argument("--all-city-pairs", dest="all_city_pairs", action="store_true", default=None,
+                       help="Also trade every market city -> city route.")
+    pairs.add_argument("--flips-only", dest="all_city_pairs", action="store_false",
+                       help="Only trade the routes in flips.json.")
+    parser.add_argument("--top", type=int, default=BACKTEST_REPORT_TOP, help="Items listed in the text report.")
+    parser.add_argument("--json", metavar="PATH", help="Also write the full report as JSON.")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    setup_logging(log_file_prefix="backtest")
+
+    metadata_loader = MetadataLoader()
+    metadata_loader.sync_metadata()
+    flip_loader = FlipLoader()
+    flip_loader.load_flips()
+    engine = ArbitrageEngine(use_premium_tax=not args.non_premium)
+    if args.all_city_pairs is None:
+        route_engine = RouteEngine(engine, flip_loader)
+    else:
+        route_engine = RouteEngine(engine, flip_loader, args.all_city_pairs)
+    backtester = Backtester(engine, metadata_loader.build_item, route_engine.routes(),
+                            travel_minutes=args.travel_minutes, max_fill_wait_minutes=args.max_wait_minutes)
+
+    db_manager = history = None
+    started = time.monotonic()
+    try:
+        if args.snapshots:
+            observations = snapshot_prices(SnapshotReplaySource(args.snapshots))
+        else:
+            db_manager = DatabaseManager(args.db)
+            history = PriceHistoryStore(db_manager)
+            observations = history.iter_observations(time.time() - args.days * 86400)
+        # Generator pipeline: observations -> simulated outcomes -> running aggregates
+        report = BacktestReport().consume(backtester.run(observations))
+    except KeyboardInterrupt:
+        logging.info("Interrupted.")
+        return 1
+    finally:
+        if history is not None:
+            history.close()
+        if db_manager is not None:
+            db_manager.close()
+    logging.info(f"Backtest finished in {time.monotonic() - started:.1f}s.")
+
+    print("\n".join(report.format_lines(args.top)))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report.to_dict(), f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from abc import ABC, abstractmethod
+from typing import List, Optional, Set, TextIO
+
+# Add the project root to the Python path to resolve local imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Nothing below may import customtkinter: this entry point has to run on machines without a display
+from utils.logger import setup_logging
+from services.api_client import APIClient
+from services.price_cache import PriceCache
+from services.arbitrage_engine import ArbitrageEngine
+from services.incremental_engine import IncrementalArbitrageEngine, TradeDiff, TradeKey
+from services.route_engine import RouteEngine
+from services.scan_pipeline import ScanPipeline
+from services.refresh_scheduler import RefreshScheduler
+from services.notification_service import NotificationService, WebhookSink, default_sinks
+from services.snapshot_store import SnapshotRecorder, SnapshotReplaySource
+from data.metadata_loader import MetadataLoader
+from data.flip_loader import FlipLoader
+from database.db_manager import DatabaseManager
+from database.price_history import PriceHistoryStore
+from database.write_behind import WriteBehindQueue
+from models.trade import Trade
+from utils.metrics import metrics
+from config.constants import SCAN_QUALITIES
+
+TRADE_FIELDS = ["item_id", "quality", "city_buy", "city_sell", "buy_price", "sell_price",
+                "unit_profit", "roi", "trip_profit", "silver_per_kg", "timestamp"]
+
+class TradeWriter(ABC):
+    """Writes trade changes as they stream out of the scan pipeline."""
+
+    @abstractmethod
+    def write(self, diff: TradeDiff):
+        """Writes one batch's added, updated and removed trades."""
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+class StreamTradeWriter(TradeWriter):
+    """Base for text formats that emit one record per trade event."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def write(self, diff: TradeDiff):
+        for event, trades in (("added", diff.added), ("updated", diff.updated), ("removed", diff.removed)):
+            for trade in trades:
+                self.write_trade(event, trade)
+        self.flush()
+
+    @abstractmethod
+    def write_trade(self, event: str, trade: Trade):
+        """Writes a single trade event."""
+
+    def flush(self):
+        self.stream.flush()
+
+    @staticmethod
+    def trade_record(event: str, trade: Trade) -> dict:
+        record = {"event": event}
+        for name in TRADE_FIELDS:
+            record[name] = getattr(trade, name)
+        record["timestamp"] = trade.timestamp.isoformat()
+        return record
+
+class JsonLinesWriter(StreamTradeWriter):
+    def write_trade(self, event: str, trade: Trade):
+        self.stream.write(json.dumps(self.trade_record(event, trade)) + "\n")
+
+class CsvWriter(StreamTradeWriter):
+    def __init__(self, stream: TextIO):
+        super().__init__(stream)
+        self.writer = csv.DictWriter(stream, fieldnames=["event"] + TRADE_FIELDS)
+        self.writer.writeheader()
+
+    def write_trade(self, event: str, trade: Trade):
+        self.writer.writerow(self.trade_record(event, trade))
+
+class DatabaseWriter(TradeWriter):
+    """Keeps the trade_opportunities table in step with the engine's current opportunity set."""
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+
+    def write(self, diff: TradeDiff):
+        # One transaction per kind instead of one per trade
+        if diff.added or diff.updated:
+            self.db_manager.save_trades(diff.added + diff.updated)
+        if diff.removed:
+            self.db_manager.delete_trades(diff.removed)
+
+class HeadlessScanner:
+    """The GUI's scan orchestration without Tk: metadata, routes, pipeline and persistence."""
+
+    def __init__(self, include_all_city_pairs: Optional[bool] = None, notify: bool = True,
+                 qualities: Optional[List[int]] = None, min_roi: Optional[float] = None,
+                 webhook_url: Optional[str] = None, metrics_path: Optional[str] = None,
+                 record_path: Optional[str] = None, persist: bool = True, use_async: bool = False,
+                 vector: bool = False):
+        self.qualities = qualities or SCAN_QUALITIES
+        self.min_roi = min_roi
+        # Trades the writer has been given and not yet told to remove; only tracked with min_roi
+        self.emitted: Set[TradeKey] = set()
+        self.metrics_path = metrics_path
+
+        self.metadata_loader = MetadataLoader()
+        self.flip_loader = FlipLoader()
+        # A replay must not create, read or roll up market.db
+        self.db_manager = self.price_history = self.write_behind = None
+        if persist:
+            self.db_manager = DatabaseManager()
+            self.price_history = PriceHistoryStore(self.db_manager)
+            self.write_behind = WriteBehindQueue(self.db_manager, self.price_history)
+        self.recorder = SnapshotRecorder(record_path) if record_path else None
+        # A recording has to capture every response, so the response cache is bypassed while recording
+        use_cache = persist and self.recorder is None
+        cache = PriceCache() if use_cache else None
+        if use_async:
+            # aiohttp is only imported when the asyncio client is asked for
+            from services.async_api_client import AsyncAPIClient, BlockingAPIClient
+            self.api_client = BlockingAPIClient(AsyncAPIClient(cache=cache, recorder=self.recorder))
+        else:
+            self.api_client = APIClient(cache=cache, recorder=self.recorder)
+        self.arbitrage_engine = ArbitrageEngine()
+        if include_all_city_pairs is None:
+            self.route_engine = RouteEngine(self.arbitrage_engine, self.flip_loader)
+        else:
+            self.route_engine = RouteEngine(self.arbitrage_engine, self.flip_loader, include_all_city_pairs)
+        vector_engine = None
+        if vector:
+            # numpy is only imported when the batch engine is asked for
+            from services.vector_engine import VectorArbitrageEngine
+            if not VectorArbitrageEngine.available():
+                raise ImportError("--vector requires numpy (pip install numpy).")
+            vector_engine = VectorArbitrageEngine(self.arbitrage_engine)
+        self.incremental_engine = IncrementalArbitrageEngine(self.arbitrage_engine, self.metadata_loader.build_item,
+                                                             vector_engine=vector_engine)
+        self.notification_service = None
+        if notify:
+            sinks = default_sinks()
+            if webhook_url:
+                sinks.append(WebhookSink(webhook_url))
+            self.notification_service = NotificationService(sinks)
+        # Without persistence the results depend only on the input, which replays rely on
+        self.scan_pipeline = ScanPipeline(self.api_client, self.incremental_engine, self.price_history,
+                                          self.write_behind, self.notification_service)
+
+    def sync(self, offline: bool = False):
+        """Same startup work as MainWindow.initial_sync, run in the foreground.
+
+        offline loads the local metadata without revalidating it and skips the
+        database housekeeping, so a replay touches neither the network nor market.db.
+        """
+        self.metadata_loader.sync_metadata(offline=offline)
+        self.flip_loader.load_flips()
+        self.incremental_engine.set_routes(self.route_engine.routes())
+        if offline:
+            return
+        self.db_manager.purge_old_data()
+        self.price_history.downsample()
+
+    def filter_diff(self, diff: TradeDiff) -> TradeDiff:
+        """Applies min_roi, turning threshold crossings into adds and removes for the writer."""
+        if self.min_roi is None:
+            return diff
+        filtered = TradeDiff()
+        for trade in diff.added + diff.updated:
+            key = (trade.item_id, trade.quality, trade.city_buy, trade.city_sell)
+            if trade.roi >= self.min_roi:
+                (filtered.updated if key in self.emitted else filtered.added).append(trade)
+                self.emitted.add(key)
+            elif key in self.emitted:
+                # Fell below the threshold: consumers must drop the row they were given
+                filtered.removed.append(trade)
+                self.emitted.discard(key)
+        for trade in diff.removed:
+            key = (trade.item_id, trade.quality, trade.city_buy, trade.city_sell)
+            if key in self.emitted:
+                filtered.removed.append(trade)
+                self.emitted.discard(key)
+        return filtered
+
+    def scan_once(self, writer: TradeWriter):
+        """Scans every Black Market eligible item once, writing each batch's changes as it completes."""
+        item_ids = self.metadata_loader.get_bm_eligible_items()
+        started = time.monotonic()
+        for result in self.scan_pipeline.scan(item_ids, self.route_engine.locations(), self.qualities):
+            writer.write(self.filter_diff(result.diff))
+        logging.info(f"Scanned {len(item_ids)} items in {time.monotonic() - started:.1f}s; "
+                     f"{len(self.incremental_engine.opportunities)} opportunities.")
+        self.export_metrics()
+
+    def export_metrics(self):
+        """Rewrites the --metrics file, so a scraper or dashboard always sees the latest totals."""
+        if not self.metrics_path:
+            return
+        try:
+            metrics.export(self.metrics_path)
+        except OSError as e:
+            logging.error(f"Failed to export metrics: {e}")
+
+    def replay(self, writer: TradeWriter, source: SnapshotReplaySource):
+        """Runs recorded snapshots through the pipeline once, writing trade changes like a scan would."""
+        started = time.monotonic()
+        batches = 0
+        for result in self.scan_pipeline.replay(source):
+            writer.write(self.filter_diff(result.diff))
+            batches += 1
+        logging.info(f"Replayed {batches} batches in {time.monotonic() - started:.1f}s; "
+                     f"{len(self.incremental_engine.opportunities)} opportunities.")
+        self.export_metrics()
+
+    def run_continuous(self, writer: TradeWriter, interval: float):
+        """Full scans every `interval` seconds until interrupted."""
+        while True:
+            started = time.monotonic()
+            try:
+                self.scan_once(writer)
+            except Exception as e:
+                logging.error(f"Scan failed: {e}")
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    def run_scheduled(self, writer: TradeWriter):
+        """Budgeted, prioritised refresh cycles from RefreshScheduler until interrupted."""
+        scheduler = RefreshScheduler(self.scan_pipeline, self.metadata_loader.get_bm_eligible_items,
+                                     self.route_engine.locations, self.qualities,
+                                     lambda result: writer.write(self.filter_diff(result.diff)))
+        scheduler.start()
+        try:
+            while scheduler.running:
+                time.sleep(1)
+                self.export_metrics()
+        finally:
+            scheduler.stop()
+
+    def close(self):
+        if self.notification_service is not None:
+            self.notification_service.close(timeout=5)
+        if self.write_behind is not None:
+            self.write_behind.close()
+        self.api_client.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.db_manager is not None:
+            self.price_history.close()
+            self.db_manager.close()
+        self.export_metrics()
+
+def build_writer(output_format: str, stream: TextIO, db_manager: DatabaseManager) -> TradeWriter:
+    if output_format == "csv":
+        return CsvWriter(stream)
+    if output_format == "db":
+        return DatabaseWriter(db_manager)
+    return JsonLinesWriter(stream)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Albion Market Master headless scanner.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--interval", type=float, metavar="SECONDS",
+                      help="Rescan every Black Market item every SECONDS instead of scanning once.")
+    mode.add_argument("--scheduled", action="store_true",
+                      help="Run the prioritised auto-refresh scheduler continuously.")
+    mode.add_argument("--replay", nargs="+", metavar="PATH",
+                      help="Process recorded snapshot files (oldest first) instead of calling the API. "
+                           "Nothing is persisted, notifications are off and metadata is only read from disk.")
+    parser.add_argument("--since", type=datetime.fromisoformat, metavar="ISO_TIME",
+                        help="With --replay, skip snapshots recorded before this local time.")
+    parser.add_argument("--until", type=datetime.fromisoformat, metavar="ISO_TIME",
+                        help="With --replay, stop at snapshots recorded at or after this local time.")
+    parser.add_argument("--format", choices=["jsonl", "csv", "db"], default="jsonl",
+                        help="jsonl/csv stream trade changes; db keeps the trade_opportunities table current "
+                             "(not with --replay).")
+    parser.add_argument("--output", metavar="PATH", help="File for jsonl/csv output (default: stdout).")
+    parser.add_argument("--min-roi", type=float, metavar="PERCENT", help="Only emit trades with at least this ROI.")
+    parser.add_argument("--qualities", type=lambda s: [int(q) for q in s.split(",")], metavar="Q1,Q2",
+                        help="Qualities to scan (default: %s)." % ",".join(map(str, SCAN_QUALITIES)))
+    pairs = parser.add_mutually_exclusive_group()
+    pairs.add_argument("--all-city-pairs", dest="all_city_pairs", action="store_true", default=None,
+                       help="Also evaluate every market city -> city route.")
+    pairs.add_argument("--flips-only", dest="all_city_pairs", action="store_false",
+                       help="Only evaluate the routes in flips.json.")
+    parser.add_argument("--no-notify", action="store_true", help="Disable notifications.")
+    parser.add_argument("--webhook", metavar="URL", help="Also POST alerts as JSON to this URL.")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Fetch batches as asyncio coroutines (needs aiohttp) instead of worker threads.")
+    parser.add_argument("--vector", action="store_true",
+                        help="Evaluate large batches with the NumPy kernel instead of pair by pair (needs numpy).")
+    parser.add_argument("--record", metavar="PATH",
+                        help="Append every API response to this gzip snapshot file for later --replay.")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="Export timing metrics after every scan (.prom for Prometheus text, otherwise JSON).")
+    args = parser.parse_args(argv)
+    if args.record and args.replay:
+        parser.error("--record cannot be combined with --replay")
+    if args.format == "db" and args.replay:
+        parser.error("--format db cannot be combined with --replay, which never writes to the database")
+    if (args.since or args.until) and not args.replay:
+        parser.error("--since/--until only apply to --replay")
+    return args
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    # Logs go to stderr and the log file; stdout carries only the data
+    setup_logging(log_file_prefix="headless")
+
+    scanner = HeadlessScanner(include_all_city_pairs=args.all_city_pairs,
+                              notify=not args.no_notify and not args.replay,
+                              qualities=args.qualities, webhook_url=args.webhook, metrics_path=args.metrics,
+                              min_roi=args.min_roi / 100 if args.min_roi is not None else None,
+                              record_path=args.record, persist=not args.replay, use_async=args.use_async,
+                              vector=args.vector)
+    stream = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    writer = build_writer(args.format, stream, scanner.db_manager)
+    try:
+        scanner.sync(offline=bool(args.replay))
+        if args.replay:
+            scanner.replay(writer, SnapshotReplaySource(args.replay, args.since, args.until))
+        elif args.scheduled:
+            scanner.run_scheduled(writer)
+        elif args.interval:
+            scanner.run_continuous(writer, args.interval)
+        else:
+            scanner.scan_once(writer)
+    except KeyboardInterrupt:
+        logging.info("Interrupted, shutting down.")
+    finally:
+        writer.close()
+        if stream is not sys.stdout:
+            stream.close()
+        scanner.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
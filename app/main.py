@@ -1,16 +1,20 @@
 
 import sys
 import os
-import customtkinter
 
 # Add the project root to the Python path to resolve local imports
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+# Imported first so the startup profile covers everything after it
+from utils.startup_profile import profiler
+
 # Now we can safely import from other modules
-from utils.logger import setup_logging
-from ui.main_window import MainWindow
+with profiler.phase("import ui"):
+    import customtkinter
+    from utils.logger import setup_logging
+    from ui.main_window import MainWindow
 
 def main():
     customtkinter.set_appearance_mode("System")  # Modes: "System" (standard), "Dark", "Light"
@@ -20,7 +24,8 @@ def main():
     setup_logging()
     
     # Start the application
-    app = MainWindow()
+    with profiler.phase("build window"):
+        app = MainWindow()
     app.mainloop()
 
 if __name__ == "__main__":
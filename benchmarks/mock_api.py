@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# Add the project root to the Python path to resolve local imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from config.constants import BLACK_MARKET_CITY_NAME
+
+def synthetic_row(item_id: str, city: str, quality: int, seed: int = 42) -> Dict:
+    """A /prices row that is the same for every run and every request with the same seed."""
+    rng = random.Random(zlib.crc32(f"{seed}:{item_id}:{city}:{quality}".encode()))
+    base = 1000 + zlib.crc32(item_id.encode()) % 200000
+    if city == BLACK_MARKET_CITY_NAME:
+        # A non-zero ask too, since ArbitrageEngine skips sell-side rows without one
+        buy = int(base * rng.uniform(0.9, 1.4))
+        sell = int(buy * 1.1)
+    else:
+        sell = int(base * rng.uniform(0.8, 1.2))
+        buy = int(sell * rng.uniform(0.7, 0.95))
+    stamp = "2024-01-01T00:00:00"
+    return {"item_id": item_id, "city": city, "quality": quality,
+            "sell_price_min": sell, "sell_price_min_date": stamp, "sell_price_max": sell, "sell_price_max_date": stamp,
+            "buy_price_min": buy, "buy_price_min_date": stamp, "buy_price_max": buy, "buy_price_max_date": stamp}
+
+class MockAlbionAPI:
+    """Local stand-in for the Albion Data Project /prices endpoint.
+
+    Rows come from a recorded fixture (a JSON list of /prices rows) when one is given,
+    otherwise they are synthesised deterministically from the seed, with the Black
+    Market bidding above city asks often enough to produce trades. Latency, periodic
+    429s with Retry-After, random 500s and 414s for long URLs are all configurable.
+    """
+
+    def __init__(self, latency: float = 0.05, rate_limit_every: int = 0, retry_after: float = 1.0,
+                 failure_rate: float = 0.0, max_url_length: int = 4096, fixture_path: Optional[str] = None,
+                 seed: int = 42, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.failure_rate = failure_rate
+        self.max_url_length = max_url_length
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.fixture: Dict[Tuple[str, str, int], Dict] = {}
+        if fixture_path:
+            with open(fixture_path, "r", encoding="utf-8") as f:
+                for row in json.load(f):
+                    self.fixture[(row["item_id"], row["city"], row["quality"])] = row
+
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "failed": 0, "too_long": 0, "rows": 0}
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v2/"
+
+    def start(self) -> "MockAlbionAPI":
+        self.thread = threading.Thread(target=self.server.serve_forever, name="mock-albion-api", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "MockAlbionAPI":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def rows_for(self, items: List[str], cities: List[str], qualities: List[int]) -> List[Dict]:
+        rows = []
+        for item_id in items:
+            for city in cities:
+                for quality in qualities:
+                    row = self.fixture.get((item_id, city, quality)) if self.fixture else synthetic_row(item_id, city, quality, self.seed)
+                    if row is not None:
+                        rows.append(row)
+        return rows
+
+    def _decide(self, url_length: int) -> Tuple[int, Dict[str, str]]:
+        """Status code and extra headers for the next request."""
+        with self.lock:
+            self.stats["requests"] += 1
+            count = self.stats["requests"]
+            if url_length > self.max_url_length:
+                self.stats["too_long"] += 1
+                return 414, {}
+            if self.rate_limit_every and count % self.rate_limit_every == 0:
+                self.stats["rate_limited"] += 1
+                return 429, {"Retry-After": f"{self.retry_after:g}"}
+            if self.failure_rate and self.random.random() < self.failure_rate:
+                self.stats["failed"] += 1
+                return 500, {}
+        return 200, {}
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real service
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if "/prices/" not in parts.path:
+                    return self._send(404, b"")
+                status, headers = api._decide(len(self.path))
+                if api.latency:
+                    time.sleep(api.latency)
+                if status != 200:
+                    return self._send(status, b"", headers)
+
+                items = [unquote(i) for i in parts.path.split("/prices/", 1)[1].split(",") if i]
+                query = parse_qs(parts.query)
+                cities = query.get("locations", [""])[0].split(",")
+                qualities = [int(q) for q in query.get("qualities", ["1"])[0].split(",") if q]
+                rows = api.rows_for(items, cities, qualities)
+                with api.lock:
+                    api.stats["rows"] += len(rows)
+                self._send(200, json.dumps(rows).encode(), {"Content-Type": "application/json"})
+
+            def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+def record_fixture(item_ids: List[str], locations: List[str], qualities: List[int], path: str):
+    """Saves live /prices rows as a fixture the mock can replay."""
+    from services.api_client import APIClient
+
+    client = APIClient()
+    try:
+        rows = client.fetch_prices(item_ids, locations, qualities)
+    finally:
+        client.close()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rows, f)
+    print(f"Recorded {len(rows)} rows to {path}")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve a mock /prices endpoint, or record a fixture from the live API.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response.")
+    parser.add_argument("--rate-limit-every", type=int, default=0, metavar="N", help="Answer every Nth request with 429.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of a 500 response.")
+    parser.add_argument("--fixture", help="Serve rows from this recorded JSON file instead of synthetic ones.")
+    parser.add_argument("--record", metavar="PATH", help="Fetch --items from the live API into PATH and exit.")
+    parser.add_argument("--items", help="Comma-separated item IDs for --record.")
+    parser.add_argument("--locations", default="Lymhurst,Martlock,Bridgewatch,Fort Sterling,Thetford,Caerleon,Black Market")
+    parser.add_argument("--qualities", default="1,2,3")
+    args = parser.parse_args(argv)
+
+    qualities = [int(q) for q in args.qualities.split(",")]
+    if args.record:
+        if not args.items:
+            parser.error("--record needs --items")
+        record_fixture(args.items.split(","), args.locations.split(","), qualities, args.record)
+        return
+
+    api = MockAlbionAPI(latency=args.latency, rate_limit_every=args.rate_limit_every,
+                        failure_rate=args.failure_rate, fixture_path=args.fixture, port=args.port)
+    print(f"Mock Albion Data API on {api.base_url} (Ctrl+C to stop)")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.server.server_close()
+
+if __name__ == "__main__":
+    main()
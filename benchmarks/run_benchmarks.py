@@ -0,0 +1,319 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Add the project root to the Python path to resolve local imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.mock_api import MockAlbionAPI, synthetic_row
+from config.constants import API_BATCH_TARGET_SECONDS, UI_RESPONSE_TARGET_MS, MEMORY_USAGE_TARGET_MB, STARTUP_TARGET_SECONDS
+from config.constants import API_RATE_LIMIT_PER_SECOND, API_RATE_LIMIT_BURST, MARKET_CITIES, BLACK_MARKET_CITY_NAME, SCAN_QUALITIES
+from models.item import Item
+from models.price import Price
+# resource only exists on Unix; peak memory is simply not reported elsewhere
+try:
+    import resource
+except ImportError:
+    resource = None
+
+CITIES = MARKET_CITIES + [BLACK_MARKET_CITY_NAME]
+
+class Results:
+    """Collects metrics as {benchmark: {metric: {"value", "unit", "better"[, "target"]}}}."""
+
+    def __init__(self):
+        self.benchmarks: Dict[str, Dict[str, Dict]] = {}
+
+    def add(self, benchmark: str, metric: str, value: float, unit: str, better: str = "lower",
+            target: Optional[float] = None):
+        entry = {"value": round(value, 6), "unit": unit, "better": better}
+        if target is not None:
+            entry["target"] = target
+            entry["within_target"] = value <= target if better == "lower" else value >= target
+        self.benchmarks.setdefault(benchmark, {})[metric] = entry
+
+    def to_dict(self) -> Dict:
+        return {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "benchmarks": self.benchmarks
+        }
+
+def bench_item_ids(count: int) -> List[str]:
+    return [f"T{4 + i % 5}_MAIN_BENCH{i}" for i in range(count)]
+
+def bench_item(item_id: str) -> Item:
+    return Item(item_id=item_id, item_name=item_id, item_type="weapon", weight=1.5 + len(item_id) % 7, tier=4,
+                enchantment=0, max_stack_size=1, craftable=True, salvageable=True, equipable=True)
+
+def synthetic_prices(item_ids: List[str]) -> List[Price]:
+    """The same market the mock API serves, without going over HTTP."""
+    now = datetime.now()
+    return [Price.from_api(synthetic_row(item_id, city, quality), now)
+            for item_id in item_ids for city in CITIES for quality in SCAN_QUALITIES]
+
+def timed(fn: Callable, repeat: int = 3) -> float:
+    """Best wall time of `repeat` runs, which is the least noisy estimate."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def bench_refresh(results: Results, items: int, latency: float, rate_limit_every: int, failure_rate: float,
+                  fixture: Optional[str], rate: float, burst: int):
+    """End-to-end refresh against the mock: plan, fetch, parse and incremental compute."""
+    from services.api_client import APIClient
+    from services.arbitrage_engine import ArbitrageEngine
+    from services.incremental_engine import IncrementalArbitrageEngine
+    from services.rate_limiter import TokenBucket
+    from services.scan_pipeline import ScanPipeline
+
+    item_ids = bench_item_ids(items)
+    if fixture:
+        with open(fixture, "r", encoding="utf-8") as f:
+            item_ids = list(dict.fromkeys(row["item_id"] for row in json.load(f)))
+
+    with MockAlbionAPI(latency=latency, rate_limit_every=rate_limit_every, failure_rate=failure_rate,
+                       fixture_path=fixture) as api:
+        client = APIClient(base_url=api.base_url, rate_limiter=TokenBucket(rate, burst))
+        engine = IncrementalArbitrageEngine(ArbitrageEngine(), bench_item)
+        pipeline = ScanPipeline(client, engine)
+        try:
+            started = time.perf_counter()
+            completions = []
+            for _ in pipeline.scan(item_ids, CITIES, SCAN_QUALITIES):
+                completions.append(time.perf_counter() - started)
+            total = time.perf_counter() - started
+        finally:
+            client.close()
+
+    gaps = [b - a for a, b in zip([0.0] + completions, completions)]
+    results.add("refresh", "total_seconds", total, "s")
+    results.add("refresh", "first_batch_seconds", completions[0] if completions else total, "s")
+    # The longest the table goes without an update during a refresh
+    results.add("refresh", "max_batch_gap_seconds", max(gaps, default=total), "s", target=API_BATCH_TARGET_SECONDS)
+    results.add("refresh", "items_per_second", len(item_ids) / total if total else 0.0, "items/s", "higher")
+    results.add("refresh", "requests", api.stats["requests"], "count")
+    results.add("refresh", "rate_limited", api.stats["rate_limited"], "count")
+    results.add("refresh", "opportunities", len(engine.opportunities), "count", "higher")
+
+def bench_engine(results: Results, items: int):
+    """Trade evaluation throughput: scalar engine, numpy kernel and incremental apply."""
+    from services.arbitrage_engine import ArbitrageEngine
+    from services.incremental_engine import IncrementalArbitrageEngine
+    from services.vector_engine import PriceMatrix, VectorArbitrageEngine
+
+    prices = synthetic_prices(bench_item_ids(items))
+    routes = [(city, BLACK_MARKET_CITY_NAME) for city in MARKET_CITIES]
+    evaluations = items * len(SCAN_QUALITIES) * len(routes)
+    vector = VectorArbitrageEngine(ArbitrageEngine())
+
+    scalar_seconds = timed(lambda: vector.calculate_trades_scalar(prices, bench_item, routes))
+    results.add("engine", "scalar_evaluations_per_second", evaluations / scalar_seconds, "evals/s", "higher")
+
+    if vector.available():
+        weights = {item_id: bench_item(item_id).weight for item_id in bench_item_ids(items)}
+        # A fast kernel is only worth measuring if it still agrees with the scalar engine
+        def trade_set(trades):
+            return {(t.item_id, t.quality, t.city_buy, t.city_sell, t.buy_price, t.sell_price,
+                     t.unit_profit, t.roi, t.trip_profit, t.silver_per_kg, t.timestamp) for t in trades}
+        scalar_trades = trade_set(vector.calculate_trades_scalar(prices, bench_item, routes))
+        vector_trades = trade_set(vector.calculate_trades(PriceMatrix.from_prices(prices), weights.get, routes))
+        if scalar_trades != vector_trades:
+            raise AssertionError(f"Vector kernel disagrees with the scalar engine on "
+                                 f"{len(scalar_trades ^ vector_trades)} trades, e.g. {min(scalar_trades ^ vector_trades)}")
+        results.add("engine", "trades", len(vector_trades), "count")
+
+        vector_seconds = timed(lambda: vector.calculate_trades(PriceMatrix.from_prices(prices), weights.get, routes))
+        results.add("engine", "vector_evaluations_per_second", evaluations / vector_seconds, "evals/s", "higher")
+
+    def incremental():
+        IncrementalArbitrageEngine(ArbitrageEngine(), bench_item, routes).apply(prices)
+    results.add("engine", "incremental_prices_per_second", len(prices) / timed(incremental), "prices/s", "higher")
+
+def bench_memory(results: Results, items: int):
+    """Traced memory of a full scan (7 locations x 5 qualities) held by the engine and as a PriceMatrix."""
+    from services.arbitrage_engine import ArbitrageEngine
+    from services.incremental_engine import IncrementalArbitrageEngine
+    from services.vector_engine import PriceMatrix, VectorArbitrageEngine
+
+    item_ids = bench_item_ids(items)
+    rows = [synthetic_row(item_id, city, quality) for item_id in item_ids for city in CITIES for quality in range(1, 6)]
+    routes = [(city, BLACK_MARKET_CITY_NAME) for city in MARKET_CITIES]
+    now = datetime.now()
+
+    tracemalloc.start()
+    try:
+        prices = [Price.from_api(row, now) for row in rows]
+        engine = IncrementalArbitrageEngine(ArbitrageEngine(), bench_item, routes)
+        engine.apply(prices)
+        del prices  # The engine keeps the latest Price per (item, quality, city)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    results.add("memory", "full_scan_peak_mb", peak / (1 << 20), "MB", target=MEMORY_USAGE_TARGET_MB)
+    results.add("memory", "rows", len(rows), "count")
+
+    if VectorArbitrageEngine.available():
+        matrix = PriceMatrix.from_rows(rows)
+        results.add("memory", "price_matrix_mb", matrix.nbytes() / (1 << 20), "MB", target=MEMORY_USAGE_TARGET_MB)
+
+def bench_database(results: Results, items: int):
+    """Bulk price upserts and history appends into a throwaway database."""
+    from database.db_manager import DatabaseManager
+    from database.price_history import PriceHistoryStore
+
+    prices = synthetic_prices(bench_item_ids(items))
+    tmp_dir = tempfile.mkdtemp(prefix="amm-bench-db-")
+    try:
+        db = DatabaseManager(os.path.join(tmp_dir, "bench.db"))
+        history = PriceHistoryStore(db)
+        results.add("database", "upserts_per_second", len(prices) / timed(lambda: db.save_prices(prices)), "rows/s", "higher")
+        results.add("database", "history_rows_per_second", len(prices) / timed(lambda: history.record(prices)), "rows/s", "higher")
+        item_ids = bench_item_ids(items)
+        results.add("database", "avg_24h_lookup_seconds", timed(lambda: history.get_avg_24h(item_ids)), "s")
+        history.close()
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def bench_metadata(results: Results, items: int):
+    """items.json parse on a cold start and the column cache on a warm one."""
+    from data.metadata_loader import MetadataLoader
+
+    tmp_dir = tempfile.mkdtemp(prefix="amm-bench-meta-")
+    try:
+        records = [{"UniqueName": f"T{4 + i % 5}_MAIN_BENCH{i}@{i % 4}" if i % 3 else f"T{4 + i % 5}_RES_BENCH{i}",
+                    "LocalizedNames": {"EN-US": f"Bench Item {i}", "PT-BR": f"Item {i}"},
+                    "Weight": 1.5, "ItemCategory": "weapon" if i % 3 else "resource", "Tier": 4 + i % 5}
+                   for i in range(items)]
+        with open(os.path.join(tmp_dir, "items.json"), "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=4)
+        with open(os.path.join(tmp_dir, "world.json"), "w", encoding="utf-8") as f:
+            json.dump([{"Index": "3005", "UniqueName": "Caerleon"}], f)
+
+        def cold():
+            loader = MetadataLoader(tmp_dir)
+            if os.path.exists(loader.items_cache.cache_path):
+                os.remove(loader.items_cache.cache_path)
+            loader._load_metadata()
+
+        results.add("metadata", "cold_load_seconds", timed(cold), "s", target=STARTUP_TARGET_SECONDS)
+        results.add("metadata", "warm_load_seconds", timed(lambda: MetadataLoader(tmp_dir)._load_metadata()), "s",
+                    target=STARTUP_TARGET_SECONDS)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def bench_ui_model(results: Results, trades: int):
+    """Tk-free part of a table redraw: apply a batch diff, re-sort and format one screen of rows."""
+    from services.arbitrage_engine import ArbitrageEngine
+    from services.vector_engine import VectorArbitrageEngine
+    from ui.trade_table_model import TradeTableModel
+
+    routes = [(city, BLACK_MARKET_CITY_NAME) for city in MARKET_CITIES]
+    # The synthetic market makes roughly 11 of the 18 quality x route pairs per item profitable
+    all_trades = VectorArbitrageEngine(ArbitrageEngine()).calculate_trades_scalar(
+        synthetic_prices(bench_item_ids(max(1, trades // 8))), bench_item, routes)
+    all_trades = all_trades[:trades]
+
+    model = TradeTableModel(lambda item_id: item_id, lambda item_id: 4)
+    model.set_trades(all_trades)
+    batch = all_trades[:200]
+
+    def redraw():
+        model.upsert(batch)
+        for key in model.visible_keys()[:60]:
+            model.format_row(key)
+
+    results.add("ui_model", "batch_redraw_ms", timed(redraw, 5) * 1000, "ms", target=UI_RESPONSE_TARGET_MS)
+    results.add("ui_model", "rows", len(all_trades), "count")
+
+BENCHMARKS = ["refresh", "engine", "memory", "database", "metadata", "ui_model"]
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Metrics that got worse than the baseline by more than `tolerance` (a fraction)."""
+    regressions = []
+    for name, metrics in current["benchmarks"].items():
+        for metric, entry in metrics.items():
+            base = baseline.get("benchmarks", {}).get(name, {}).get(metric)
+            if not base or entry["unit"] == "count" or not base["value"]:
+                continue
+            change = (entry["value"] - base["value"]) / base["value"]
+            worse = change > tolerance if entry["better"] == "lower" else change < -tolerance
+            if worse:
+                regressions.append(f"{name}.{metric}: {base['value']} -> {entry['value']} {entry['unit']} ({change:+.0%})")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a local mock of the Albion Data API.")
+    parser.add_argument("--only", help=f"Comma-separated subset of: {','.join(BENCHMARKS)}.")
+    parser.add_argument("--items", type=int, default=3000, help="Items per benchmark.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock API latency in seconds.")
+    parser.add_argument("--rate-limit-every", type=int, default=0, metavar="N", help="Mock answers every Nth request with 429.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Mock 500 probability.")
+    parser.add_argument("--fixture", help="Recorded /prices rows for the refresh benchmark (see benchmarks.mock_api --record).")
+    parser.add_argument("--rate", type=float, default=API_RATE_LIMIT_PER_SECOND, help="Client rate limit, requests/s.")
+    parser.add_argument("--burst", type=int, default=API_RATE_LIMIT_BURST)
+    parser.add_argument("--output", metavar="PATH", help="Write the JSON results here as well as to stdout.")
+    parser.add_argument("--baseline", metavar="PATH", help="Earlier results to compare against; exits 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown versus the baseline (fraction).")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    selected = args.only.split(",") if args.only else BENCHMARKS
+    results = Results()
+    for name in selected:
+        print(f"Running {name}...", file=sys.stderr)
+        if name == "refresh":
+            bench_refresh(results, args.items, args.latency, args.rate_limit_every, args.failure_rate,
+                          args.fixture, args.rate, args.burst)
+        elif name == "engine":
+            bench_engine(results, args.items)
+        elif name == "memory":
+            bench_memory(results, args.items * 3)
+        elif name == "database":
+            bench_database(results, args.items)
+        elif name == "metadata":
+            bench_metadata(results, args.items * 10)
+        elif name == "ui_model":
+            bench_ui_model(results, args.items * 5)
+        else:
+            parser.error(f"Unknown benchmark: {name}")
+
+    if resource is not None:
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_mb = peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+        results.add("process", "peak_rss_mb", peak_mb, "MB", target=MEMORY_USAGE_TARGET_MB)
+
+    report = results.to_dict()
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,11 +6,31 @@ API_TIMEOUT = 5  # seconds
 API_RETRIES = 3
 API_BACKOFF_FACTOR = 0.5
 MAX_ITEMS_PER_BATCH = 200
+API_MAX_URL_LENGTH = 4096  # bytes, including the query string
+BATCH_PLANNER_FAILURE_TTL_SUCCESSES = 50  # A learned length limit is retried after this many successful batches
+BATCH_PLANNER_FAILURE_TTL_SECONDS = 600  # ...or after this long, whichever comes first
+BATCH_PLANNER_FAILURES_TO_RESET = 3  # Rejections at or below a length that worked before the limit drops below it
+API_MAX_CONCURRENT_BATCHES = 4
+API_RATE_LIMIT_PER_SECOND = 3.0  # Albion Data Project allows 180 requests/minute
+API_RATE_LIMIT_BURST = 5
 
 # Black Market Configuration
 BLACK_MARKET_CITY_ID = "1007"
+BLACK_MARKET_CITY_NAME = "Black Market"
 BLACK_MARKET_TRASH_RATE = 0.10
 BLACK_MARKET_EQUIPMENT_CATEGORIES = ["weapon", "armor", "offhand"]
+# Item ID slots (after the "T4_" tier prefix) used when an item has no category in items.json
+BLACK_MARKET_EQUIPMENT_ID_PREFIXES = ("MAIN_", "2H_", "OFF_", "HEAD_", "ARMOR_", "SHOES_")
+
+# Market Cities (buy side of the default Black Market flips)
+MARKET_CITIES = ["Thetford", "Lymhurst", "Bridgewatch", "Martlock", "Fort Sterling", "Caerleon"]
+SCAN_QUALITIES = [1, 2, 3]
+
+# Route Search Configuration
+ROUTE_INCLUDE_ALL_CITY_PAIRS = False  # Also evaluate every city -> city pair, not just flips.json
+
+# Vector Engine Configuration
+VECTOR_MIN_BATCH_KEYS = 64  # Changed (item, quality) pairs below which the scalar engine is faster
 
 # Tax Configuration
 PREMIUM_TAX_RATE = 0.04
@@ -21,18 +41,80 @@ MIN_ROI_PERCENTAGE = 0.03  # 3%
 MIN_SPREAD_PERCENTAGE = 0.03 # 3%
 MIN_VOLUME = 10
 
+# Metadata Download Configuration
+METADATA_CHECK_INTERVAL_HOURS = 24  # Conditional re-check, a 304 costs no download
+METADATA_DOWNLOAD_TIMEOUT = 10  # seconds
+METADATA_DOWNLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+METADATA_PUBLISH_EVERY_ITEMS = 2000  # Partial index published this often while items.json is parsed
+
 # Database Configuration
 DATABASE_NAME = "market.db"
 DATABASE_PURGE_DAYS = 1  # 24 hours
+DATABASE_SYNCHRONOUS = "NORMAL"  # Safe with WAL, avoids an fsync per commit
+DATABASE_CACHE_SIZE_KB = 16384
+
+# Price History Configuration (raw -> hourly -> daily buckets)
+HISTORY_RAW_RETENTION_HOURS = 6
+HISTORY_HOURLY_RETENTION_DAYS = 14
+HISTORY_DAILY_RETENTION_DAYS = 180
+HISTORY_HOUSEKEEPING_SECONDS = 3600  # Roll-up and purge interval while the app keeps running
+
+# Write-Behind Queue Configuration
+WRITE_BEHIND_MAX_PENDING = 50000  # Distinct price keys buffered before put() blocks
+WRITE_BEHIND_BATCH_SIZE = 5000
+WRITE_BEHIND_FLUSH_SECONDS = 2.0
+
+# Auto-Refresh Scheduler Configuration
+SCHEDULER_INTERVAL_SECONDS = 20
+SCHEDULER_REQUESTS_PER_CYCLE = 20  # Share of the API rate budget spent per cycle
+SCHEDULER_STALE_SECONDS = 1800  # Data age at which an item's base priority reaches 1
+SCHEDULER_VOLATILITY_WEIGHT = 10.0
+SCHEDULER_PROFIT_WEIGHT = 20.0
+SCHEDULER_EWMA_ALPHA = 0.3
+
+# Price Response Cache Configuration
+PRICE_CACHE_NAME = "price_cache.db"
+PRICE_CACHE_TTL_SECONDS = 300  # Re-fetch entries older than 5 minutes
+PRICE_CACHE_MAX_ENTRIES = 200000
 
 # Notification Configuration
 NOTIFICATION_COOLDOWN_MINUTES = 15
+NOTIFICATION_COOLDOWN_MAX_KEYS = 10000  # Oldest routes are forgotten first beyond this
+NOTIFICATION_COALESCE_SECONDS = 3.0  # Alerts arriving within this window become one summary
+NOTIFICATION_MAX_PENDING = 5000  # Trades waiting for the worker; further alerts are dropped
+NOTIFICATION_SUMMARY_LINES = 3  # Best trades listed in a summary
+NOTIFICATION_WEBHOOK_URL = None  # e.g. "http://127.0.0.1:8080/alerts" to POST alerts as JSON
+NOTIFICATION_WEBHOOK_TIMEOUT = 5  # seconds
+
+# Metrics Configuration
+METRICS_ENABLED = True  # Counters, latency histograms and refresh spans; near-free when off
+METRICS_SPAN_HISTORY = 20  # Refresh spans kept for the stats panel
+METRICS_EXPORT_PATH = "logs/metrics.prom"  # .prom/.txt is Prometheus text, anything else JSON
+METRICS_PANEL_REFRESH_MS = 1000
+
+# Snapshot Record/Replay Configuration
+SNAPSHOT_COMPRESSION_LEVEL = 6  # gzip level; appends stay cheap enough for the API worker threads
+
+# Backtest Configuration
+BACKTEST_DEFAULT_DAYS = 14
+BACKTEST_TRAVEL_MINUTES = 30  # Haul time from buying to arriving at the sell city
+BACKTEST_MAX_FILL_WAIT_MINUTES = 180  # No sell-side quote this long after arrival counts as unfilled
+BACKTEST_MAX_QUOTE_AGE_MINUTES = 90  # Only enter on quotes at least this fresh
+BACKTEST_REPORT_TOP = 20  # Items listed in the text report
 
 # Performance Targets (for reference)
 STARTUP_TARGET_SECONDS = 2
+STARTUP_PROFILE_NAME = "startup_profile.json"  # Written to the log directory
 API_BATCH_TARGET_SECONDS = 8
 UI_RESPONSE_TARGET_MS = 100
 MEMORY_USAGE_TARGET_MB = 200
 
+# Table View Configuration
+TABLE_VIRTUAL_THRESHOLD = 2000  # Above this many rows only a window is rendered
+TABLE_BUFFER_ROWS = 50  # Rendered above and below the visible window
+TABLE_UPDATE_CHUNK_SIZE = 300  # Treeview operations per after() tick
+TABLE_ROW_HEIGHT = 20  # pixels, ttk.Treeview default
+UI_QUEUE_POLL_MS = 50  # How often the Tk thread drains streamed scan results
+
 # Other Constants
 MOUNT_CAPACITY = 1000  # Example value, needs to be dynamic or configured
@@ -0,0 +1,84 @@
+import hashlib
+import logging
+import os
+import pickle
+from array import array
+from typing import Dict, Optional, Tuple
+
+# Bump whenever the stored columns change so old caches are rebuilt
+CACHE_VERSION = 1
+
+ItemRecord = Tuple[str, float, str, int]  # (LocalizedName, Weight, Category, Tier)
+
+class ItemsCache:
+    """Compact column cache of the fields we use from items.json.
+
+    The cache stores only name, weight, category and tier as flat columns, which
+    unpickle in milliseconds. It is stamped with the source file's mtime, size and
+    SHA-256 and rebuilt whenever the source content changes.
+    """
+
+    def __init__(self, source_path: str, cache_path: Optional[str] = None):
+        self.source_path = source_path
+        self.cache_path = cache_path or os.path.splitext(source_path)[0] + ".cache"
+
+    def load(self) -> Optional[Dict[str, ItemRecord]]:
+        """Returns the cached items, or None if the cache is missing or stale."""
+        try:
+            with open(self.cache_path, "rb") as f:
+                header = pickle.load(f)
+                if header.get("version") != CACHE_VERSION:
+                    return None
+
+                stat = os.stat(self.source_path)
+                restamp = (header["mtime"], header["size"]) != (stat.st_mtime_ns, stat.st_size)
+                # Touched but maybe not modified: only a content change invalidates the cache
+                if restamp and self._hash_source() != header["sha256"]:
+                    return None
+                columns = pickle.load(f)
+        except (OSError, EOFError, KeyError, pickle.UnpicklingError) as e:
+            logging.debug(f"Items cache unavailable ({e}), rebuilding.")
+            return None
+
+        if restamp:
+            # Only once the cache file is closed: Windows cannot replace a file that is still open
+            try:
+                self._write(header["sha256"], columns)
+            except OSError as e:
+                logging.debug(f"Could not restamp the items cache ({e}).")
+
+        ids, names, weights, category_table, category_idx, tiers = columns
+        return {
+            item_id: (name, weight, category_table[cat], tier)
+            for item_id, name, weight, cat, tier in zip(ids, names, weights, category_idx, tiers)
+        }
+
+    def save(self, items: Dict[str, ItemRecord]):
+        """Writes the cache for the current source file."""
+        category_table = sorted({record[2] for record in items.values()})
+        category_lookup = {category: i for i, category in enumerate(category_table)}
+        columns = (
+            list(items.keys()),
+            [record[0] for record in items.values()],
+            array("d", (record[1] for record in items.values())),
+            category_table,
+            array("H", (category_lookup[record[2]] for record in items.values())),
+            array("B", (record[3] for record in items.values())),
+        )
+        self._write(self._hash_source(), columns)
+
+    def _write(self, sha256: str, columns):
+        stat = os.stat(self.source_path)
+        header = {"version": CACHE_VERSION, "mtime": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256}
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(columns, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path)
+
+    def _hash_source(self) -> str:
+        digest = hashlib.sha256()
+        with open(self.source_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
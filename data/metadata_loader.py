@@ -1,11 +1,15 @@
 
 import os
-import requests
 import json
 import time
 import logging
-from typing import Dict, List
-from config.constants import STARTUP_TARGET_SECONDS
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from config.constants import BLACK_MARKET_EQUIPMENT_CATEGORIES, BLACK_MARKET_EQUIPMENT_ID_PREFIXES
+from config.constants import STARTUP_TARGET_SECONDS, METADATA_CHECK_INTERVAL_HOURS, METADATA_DOWNLOAD_TIMEOUT, METADATA_DOWNLOAD_CHUNK_SIZE
+from config.constants import METADATA_PUBLISH_EVERY_ITEMS
+from models.item import Item
+from data.metadata_cache import ItemsCache, ItemRecord
 
 class MetadataLoader:
     ITEMS_URL = "https://raw.githubusercontent.com/ao-data/ao-bin-dumps/master/formatted/items.json"
@@ -20,69 +24,264 @@ class MetadataLoader:
         
         self.items_path = os.path.join(self.data_dir, "items.json")
         self.world_path = os.path.join(self.data_dir, "world.json")
-        self.items: Dict = {}
+        self.items_cache = ItemsCache(self.items_path)
+        self.items: Dict[str, ItemRecord] = {}
         self.locations: Dict = {}
+        # Secondary indexes, rebuilt together with self.items
+        self.by_category: Dict[str, List[str]] = {}
+        self.by_tier: Dict[Tuple[int, int], List[str]] = {}
+        self.bm_eligible: List[str] = []
+        self.refresh_thread: threading.Thread | None = None
+        # Set once a complete index is in place; until then the index may be partial
+        self.loaded = threading.Event()
 
-    def sync_metadata(self):
-        """Downloads the latest metadata if it's missing or older than 7 days."""
+    def sync_metadata(self, offline: bool = False):
+        """Loads local metadata, downloading it first only if it is missing.
+
+        When local files exist they are loaded straight away and revalidated against
+        the server in the background; the in-memory index is swapped only once new
+        data has been fully downloaded and parsed. With offline=True the local files
+        are loaded as they are and never revalidated; FileNotFoundError if missing.
+        """
         start_time = time.time()
         
         # Ensure the data directory exists
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
 
-        # Check and download items.json
-        self._download_if_needed(self.ITEMS_URL, self.items_path)
-        
-        # Check and download world.json
-        self._download_if_needed(self.WORLD_URL, self.world_path)
-
-        # Load into memory
-        self._load_metadata()
+        if offline:
+            for path in (self.items_path, self.world_path):
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"{path} is missing; run once online to download it.")
+            self._load_metadata()
+        elif os.path.exists(self.items_path) and os.path.exists(self.world_path):
+            self._load_metadata()
+            self.refresh_thread = threading.Thread(target=self._refresh_in_background, daemon=True)
+            self.refresh_thread.start()
+        else:
+            # First run: nothing to show until the files are here
+            self._download_if_needed(self.ITEMS_URL, self.items_path)
+            self._download_if_needed(self.WORLD_URL, self.world_path)
+            self._load_metadata()
         
         elapsed_time = time.time() - start_time
         logging.info(f"Metadata synced in {elapsed_time:.2f} seconds.")
         if elapsed_time > STARTUP_TARGET_SECONDS:
             logging.warning(f"Startup time ({elapsed_time:.2f}s) exceeded target ({STARTUP_TARGET_SECONDS}s).")
 
-    def _download_if_needed(self, url: str, path: str):
-        """Downloads a file if it doesn't exist or is older than 7 days."""
-        needs_download = False
-        if not os.path.exists(path):
-            needs_download = True
-        else:
-            file_age_days = (time.time() - os.path.getmtime(path)) / (24 * 3600)
-            if file_age_days > 7:
-                needs_download = True
-        
-        if needs_download:
-            logging.info(f"Downloading latest metadata from {url}...")
-            response = requests.get(url, timeout=10)
+    def _refresh_in_background(self):
+        """Revalidates both metadata files and swaps in the new index if either changed."""
+        try:
+            items_changed = self._download_if_needed(self.ITEMS_URL, self.items_path)
+            world_changed = self._download_if_needed(self.WORLD_URL, self.world_path)
+            if items_changed or world_changed:
+                self._load_metadata()
+                logging.info("Metadata refreshed in the background.")
+        except Exception as e:
+            logging.error(f"Background metadata refresh failed: {e}")
+
+    def _download_if_needed(self, url: str, path: str) -> bool:
+        """Conditionally downloads a file, streaming it to disk. Returns True if the file changed."""
+        validators = self._read_validators(path)
+        file_exists = os.path.exists(path)
+        if file_exists and time.time() - validators.get("checked_at", 0) < METADATA_CHECK_INTERVAL_HOURS * 3600:
+            return False
+
+        headers = {}
+        if file_exists:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        # requests costs ~0.1s to import and is only needed when the server is actually contacted
+        import requests
+
+        logging.info(f"Checking metadata at {url}...")
+        with requests.get(url, headers=headers, stream=True, timeout=METADATA_DOWNLOAD_TIMEOUT) as response:
+            if response.status_code == 304:
+                validators["checked_at"] = time.time()
+                self._write_validators(path, validators)
+                logging.info(f"{os.path.basename(path)} is up to date (304).")
+                return False
+
             response.raise_for_status()
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(response.json(), f)
+            # Stream straight to a temp file so the payload is never held in memory
+            tmp_path = path + ".part"
+            try:
+                with open(tmp_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=METADATA_DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                os.replace(tmp_path, path)
+            finally:
+                # Only left behind when the download or the replace failed
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+            self._write_validators(path, {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "checked_at": time.time()
+            })
+        logging.info(f"Downloaded {os.path.basename(path)}.")
+        return True
+
+    @staticmethod
+    def _read_validators(path: str) -> Dict:
+        try:
+            with open(path + ".meta", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_validators(path: str, validators: Dict):
+        with open(path + ".meta", "w", encoding="utf-8") as f:
+            json.dump(validators, f)
 
     def _load_metadata(self):
-        """Parses metadata files into memory-efficient dictionaries."""
-        with open(self.items_path, "r", encoding="utf-8") as f:
-            items_data = json.load(f)
-            # Optimize items: item_id as key
-            for item in items_data:
-                self.items[item["UniqueName"]] = {
-                    "LocalizedName": item.get("LocalizedNames", {}).get("PT-BR") or item.get("LocalizedNames", {}).get("EN-US"),
-                    "Weight": item.get("Weight", 0.0),
-                    "Category": item.get("ItemCategory", ""),
-                    "Tier": item.get("Tier", 0)
-                }
-        
+        """Builds the item and location indexes, then swaps them in together.
+
+        On a cache miss with no index loaded yet (first run, or a changed items.json
+        at startup), items are parsed progressively and a partial index is published
+        every METADATA_PUBLISH_EVERY_ITEMS items so the UI can already scan them.
+        """
+        locations = {}
         with open(self.world_path, "r", encoding="utf-8") as f:
             world_data = json.load(f)
             # Optimize locations: Index as key
             for loc in world_data:
-                self.locations[loc["Index"]] = loc["UniqueName"]
+                locations[loc["Index"]] = loc["UniqueName"]
+
+        items = self.items_cache.load()
+        if items is None:
+            # A background refresh must not replace a complete index with a partial one
+            publish_partial = None if self.items else (lambda partial: self._publish(dict(partial), locations, False))
+            items = self._parse_items(publish_partial)
+            self.items_cache.save(items)
+            logging.info(f"Rebuilt items cache with {len(items)} items.")
+
+        self._publish(items, locations, True)
+
+    def _publish(self, items: Dict[str, ItemRecord], locations: Dict, complete: bool):
+        by_category, by_tier, bm_eligible = self._build_indexes(items)
+
+        # Indexes are replaced wholesale, never mutated in place, so readers on other threads stay consistent
+        self.items, self.locations = items, locations
+        self.by_category, self.by_tier, self.bm_eligible = by_category, by_tier, bm_eligible
+        if complete:
+            self.loaded.set()
+
+    @staticmethod
+    def parse_tier_enchant(item_id: str, tier: int = 0) -> Tuple[int, int]:
+        """Tier and enchantment level from an ID such as "T8_2H_DUALSCIMITAR_UNDEAD@3"."""
+        base, _, enchant = item_id.partition("@")
+        if not tier and base[:1] == "T" and base[1:2].isdigit():
+            tier = int(base[1:2])
+        return tier, int(enchant) if enchant.isdigit() else 0
+
+    @staticmethod
+    def _is_bm_equipment(item_id: str, category: str) -> bool:
+        if category:
+            return category.lower() in BLACK_MARKET_EQUIPMENT_CATEGORIES
+        # No category in the dump: fall back to the equipment slot encoded in the ID
+        slot = item_id.split("_", 1)[1] if "_" in item_id else ""
+        return slot.startswith(BLACK_MARKET_EQUIPMENT_ID_PREFIXES)
+
+    def _build_indexes(self, items: Dict[str, ItemRecord]):
+        """Builds category -> items, (tier, enchant) -> items and the Black Market eligible list."""
+        by_category: Dict[str, List[str]] = {}
+        by_tier: Dict[Tuple[int, int], List[str]] = {}
+        bm_eligible: List[str] = []
+        for item_id, (_, _, category, tier) in items.items():
+            by_category.setdefault(category.lower(), []).append(item_id)
+            by_tier.setdefault(self.parse_tier_enchant(item_id, tier), []).append(item_id)
+            if self._is_bm_equipment(item_id, category):
+                bm_eligible.append(item_id)
+        return by_category, by_tier, bm_eligible
+
+    def _parse_items(self, on_partial: Optional[Callable[[Dict[str, ItemRecord]], None]] = None) -> Dict[str, ItemRecord]:
+        """Parses the full items.json down to the fields we use, reporting partial results along the way."""
+        items = {}
+        for count, item in enumerate(self._iter_json_array(self.items_path), 1):
+            names = item.get("LocalizedNames") or {}
+            items[item["UniqueName"]] = (
+                names.get("PT-BR") or names.get("EN-US") or "",
+                float(item.get("Weight", 0.0) or 0.0),
+                item.get("ItemCategory", "") or "",
+                int(item.get("Tier", 0) or 0)
+            )
+            if on_partial is not None and count % METADATA_PUBLISH_EVERY_ITEMS == 0:
+                on_partial(items)
+        return items
+
+    @staticmethod
+    def _iter_json_array(path: str) -> Iterator[Dict]:
+        """Decodes a top-level JSON array one element at a time with the C scanner."""
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        decoder = json.JSONDecoder()
+        end = len(text)
+
+        def skip(pos: int) -> int:
+            while pos < end and text[pos] in " \t\r\n,":
+                pos += 1
+            return pos
+
+        pos = skip(text.index("[") + 1)
+        while pos < end and text[pos] != "]":
+            element, pos = decoder.raw_decode(text, pos)
+            yield element
+            pos = skip(pos)
 
     def get_item_info(self, item_id: str) -> Dict | None:
-        return self.items.get(item_id)
+        record = self.items.get(item_id)
+        if record is None:
+            return None
+        return {"LocalizedName": record[0] or None, "Weight": record[1], "Category": record[2], "Tier": record[3]}
+
+    def get_item_name(self, item_id: str) -> str | None:
+        record = self.items.get(item_id)
+        return (record[0] or None) if record else None
+
+    def get_item_tier(self, item_id: str) -> int:
+        record = self.items.get(item_id)
+        return self.parse_tier_enchant(item_id, record[3] if record else 0)[0]
+
+    def get_item_weight(self, item_id: str) -> float | None:
+        record = self.items.get(item_id)
+        return record[1] if record else None
+
+    def get_items_by_category(self, category: str) -> List[str]:
+        return self.by_category.get(category.lower(), [])
+
+    def get_items_by_tier(self, tier: int, enchantment: int | None = None) -> List[str]:
+        if enchantment is not None:
+            return self.by_tier.get((tier, enchantment), [])
+        return [item_id for (t, _), ids in self.by_tier.items() if t == tier for item_id in ids]
+
+    def get_bm_eligible_items(self) -> List[str]:
+        """Items the Black Market buys (weapons, armor and off-hands); partial while self.loaded is unset."""
+        return self.bm_eligible
 
     def get_location_name(self, location_id: str) -> str | None:
         return self.locations.get(location_id)
+
+    def build_item(self, item_id: str) -> Item | None:
+        """Builds an Item model from the loaded metadata, or None if the item is unknown."""
+        item_info = self.get_item_info(item_id)
+        if not item_info:
+            return None
+
+        return Item(
+            item_id=item_id,
+            item_name=item_info["LocalizedName"] or item_id,
+            item_type=item_info["Category"],
+            weight=item_info["Weight"],
+            tier=item_info["Tier"],
+            enchantment=self.parse_tier_enchant(item_id)[1],
+            max_stack_size=1,
+            craftable=True,
+            salvageable=True,
+            equipable=True
+        )
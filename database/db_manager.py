@@ -1,9 +1,11 @@
-
 import sqlite3
 import os
+import threading
 from datetime import datetime, timedelta
-from config.constants import DATABASE_NAME, DATABASE_PURGE_DAYS
+from typing import Iterable
+from config.constants import DATABASE_NAME, DATABASE_PURGE_DAYS, DATABASE_SYNCHRONOUS, DATABASE_CACHE_SIZE_KB
 from models.price import Price
+from models.trade import Trade
 
 class DatabaseManager:
     def __init__(self, db_path=None):
@@ -13,12 +15,25 @@ class DatabaseManager:
             db_path = os.path.join(project_root, DATABASE_NAME)
         
         self.db_path = db_path
+        # One long-lived connection shared by every thread; self.lock serialises access
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._configure_connection()
         self._initialize_db()
 
+    def _configure_connection(self):
+        """Enables WAL journaling and tunes the page cache for bulk writes."""
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(f"PRAGMA synchronous={DATABASE_SYNCHRONOUS}")
+            # Negative values are interpreted by SQLite as KiB rather than pages
+            self.conn.execute(f"PRAGMA cache_size=-{DATABASE_CACHE_SIZE_KB}")
+            self.conn.execute("PRAGMA temp_store=MEMORY")
+
     def _initialize_db(self):
         """Creates the necessary tables if they don't exist."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.lock:
+            cursor = self.conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS market_prices (
                     item_id TEXT,
@@ -31,22 +46,59 @@ class DatabaseManager:
                     PRIMARY KEY (item_id, quality, city)
                 )
             """)
-            conn.commit()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS trade_opportunities (
+                    item_id TEXT,
+                    quality INTEGER,
+                    city_buy TEXT,
+                    city_sell TEXT,
+                    buy_price INTEGER,
+                    sell_price INTEGER,
+                    unit_profit REAL,
+                    roi REAL,
+                    trip_profit REAL,
+                    silver_per_kg REAL,
+                    timestamp DATETIME,
+                    PRIMARY KEY (item_id, quality, city_buy, city_sell)
+                )
+            """)
+            self.conn.commit()
 
     def save_price(self, price: Price):
         """Inserts or replaces a price entry in the database."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
+        self.save_prices([price])
+
+    def save_prices(self, prices: Iterable[Price]):
+        """Upserts a whole refresh worth of prices in a single transaction."""
+        rows = ((p.item_id, p.quality, p.city, p.sell_price, p.buy_price, p.avg_24h, p.timestamp) for p in prices)
+        with self.lock, self.conn:
+            self.conn.executemany("""
                 INSERT OR REPLACE INTO market_prices (item_id, quality, city, sell_price, buy_price, avg_24h, timestamp)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (price.item_id, price.quality, price.city, price.sell_price, price.buy_price, price.avg_24h, price.timestamp))
-            conn.commit()
+            """, rows)
+
+    def save_trades(self, trades: Iterable[Trade]):
+        """Upserts the current opportunity for each (item, quality, route)."""
+        rows = ((t.item_id, t.quality, t.city_buy, t.city_sell, t.buy_price, t.sell_price,
+                 t.unit_profit, t.roi, t.trip_profit, t.silver_per_kg, t.timestamp) for t in trades)
+        with self.lock, self.conn:
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO trade_opportunities (item_id, quality, city_buy, city_sell, buy_price, sell_price,
+                                                            unit_profit, roi, trip_profit, silver_per_kg, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+
+    def delete_trades(self, trades: Iterable[Trade]):
+        """Removes opportunities that are no longer profitable."""
+        keys = ((t.item_id, t.quality, t.city_buy, t.city_sell) for t in trades)
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM trade_opportunities WHERE item_id = ? AND quality = ? AND city_buy = ? AND city_sell = ?", keys)
 
     def get_price(self, item_id: str, quality: int, city: str) -> Price | None:
         """Retrieves a price entry from the database."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.lock:
+            cursor = self.conn.cursor()
             cursor.execute("""
                 SELECT item_id, quality, city, sell_price, buy_price, avg_24h, timestamp
                 FROM market_prices
@@ -60,7 +112,10 @@ class DatabaseManager:
     def purge_old_data(self):
         """Deletes entries older than the configured purge period."""
         purge_threshold = datetime.now() - timedelta(days=DATABASE_PURGE_DAYS)
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM market_prices WHERE timestamp < ?", (purge_threshold,))
-            conn.commit()
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM market_prices WHERE timestamp < ?", (purge_threshold,))
+
+    def close(self):
+        """Closes the shared connection."""
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,206 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from config.constants import HISTORY_RAW_RETENTION_HOURS, HISTORY_HOURLY_RETENTION_DAYS, HISTORY_DAILY_RETENTION_DAYS
+from database.db_manager import DatabaseManager
+from models.price import Price
+
+HOUR = 3600
+DAY = 24 * HOUR
+# Each item ID is bound twice per query and SQLite's default limit is 999 parameters
+_QUERY_CHUNK = 400
+
+_BUCKET_COLUMNS = """
+    item_id TEXT,
+    quality INTEGER,
+    city TEXT,
+    bucket INTEGER,
+    sell_min INTEGER,
+    sell_max INTEGER,
+    sell_avg REAL,
+    sell_count INTEGER,
+    buy_min INTEGER,
+    buy_max INTEGER,
+    buy_avg REAL,
+    buy_count INTEGER,
+    PRIMARY KEY (item_id, quality, city, bucket)
+"""
+
+# Merges a freshly aggregated bucket into an existing one, weighting averages by count
+_MERGE_BUCKET = """
+    ON CONFLICT (item_id, quality, city, bucket) DO UPDATE SET
+        sell_min = MIN(COALESCE(sell_min, excluded.sell_min), COALESCE(excluded.sell_min, sell_min)),
+        sell_max = MAX(COALESCE(sell_max, excluded.sell_max), COALESCE(excluded.sell_max, sell_max)),
+        sell_avg = (COALESCE(sell_avg * sell_count, 0) + COALESCE(excluded.sell_avg * excluded.sell_count, 0))
+                   / NULLIF(sell_count + excluded.sell_count, 0),
+        sell_count = sell_count + excluded.sell_count,
+        buy_min = MIN(COALESCE(buy_min, excluded.buy_min), COALESCE(excluded.buy_min, buy_min)),
+        buy_max = MAX(COALESCE(buy_max, excluded.buy_max), COALESCE(excluded.buy_max, buy_max)),
+        buy_avg = (COALESCE(buy_avg * buy_count, 0) + COALESCE(excluded.buy_avg * excluded.buy_count, 0))
+                  / NULLIF(buy_count + excluded.buy_count, 0),
+        buy_count = buy_count + excluded.buy_count
+"""
+
+class PriceHistoryStore:
+    """Append-only price observations, rolled up into hourly and daily buckets as they age.
+
+    Zero prices (no open order) are stored as NULL so that they never drag the
+    min/avg statistics down. Reads go through a separate read-only connection: with
+    WAL they never wait for the write-behind thread, which holds the shared
+    connection's lock for whole batches.
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+        self._initialize_db()
+        if self.db.db_path == ":memory:":
+            # An in-memory database cannot be opened twice; share the writer's connection
+            self.read_conn, self.read_lock = self.db.conn, self.db.lock
+        else:
+            uri = Path(os.path.abspath(self.db.db_path)).as_uri() + "?mode=ro"
+            self.read_conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self.read_lock = threading.Lock()
+
+    def close(self):
+        """Closes the read connection; the shared one belongs to DatabaseManager."""
+        if self.read_conn is not self.db.conn:
+            with self.read_lock:
+                self.read_conn.close()
+
+    def _initialize_db(self):
+        with self.db.lock, self.db.conn as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS price_history (
+                    item_id TEXT,
+                    quality INTEGER,
+                    city TEXT,
+                    ts INTEGER,
+                    sell_price INTEGER,
+                    buy_price INTEGER
+                )
+            """)
+            # Covering index: history lookups never touch the table itself
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_price_history_key
+                ON price_history (item_id, quality, city, ts, sell_price, buy_price)
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_price_history_ts ON price_history (ts)")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS price_history_hourly ({_BUCKET_COLUMNS}) WITHOUT ROWID")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS price_history_daily ({_BUCKET_COLUMNS}) WITHOUT ROWID")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_price_history_hourly_bucket ON price_history_hourly (bucket)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_price_history_daily_bucket ON price_history_daily (bucket)")
+
+    def record(self, prices: Iterable[Price]):
+        """Appends one observation per price in a single transaction."""
+        rows = (
+            (p.item_id, p.quality, p.city, int(p.timestamp.timestamp()), p.sell_price or None, p.buy_price or None)
+            for p in prices
+        )
+        with self.db.lock, self.db.conn as conn:
+            conn.executemany("""
+                INSERT INTO price_history (item_id, quality, city, ts, sell_price, buy_price)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+
+    def get_avg_24h(self, item_ids: Iterable[str]) -> Dict[Tuple[str, int, str], int]:
+        """24h average sell price per (item_id, quality, city) for a whole batch of items.
+
+        Combines raw observations with the hourly buckets that replaced older raw rows.
+        """
+        item_ids = list(dict.fromkeys(item_ids))
+        since = int(time.time()) - DAY
+        averages: Dict[Tuple[str, int, str], int] = {}
+
+        with self.read_lock:
+            for i in range(0, len(item_ids), _QUERY_CHUNK):
+                chunk = item_ids[i:i + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self.read_conn.execute(f"""
+                    SELECT item_id, quality, city, SUM(total) / SUM(n)
+                    FROM (
+                        SELECT item_id, quality, city, SUM(sell_price) AS total, COUNT(sell_price) AS n
+                        FROM price_history
+                        WHERE item_id IN ({placeholders}) AND ts >= ?
+                        GROUP BY item_id, quality, city
+                        UNION ALL
+                        SELECT item_id, quality, city, SUM(sell_avg * sell_count), SUM(sell_count)
+                        FROM price_history_hourly
+                        WHERE item_id IN ({placeholders}) AND bucket >= ?
+                        GROUP BY item_id, quality, city
+                    )
+                    GROUP BY item_id, quality, city
+                    HAVING SUM(n) > 0
+                """, (*chunk, since, *chunk, since - since % HOUR))
+                for item_id, quality, city, avg in cursor:
+                    averages[(item_id, quality, city)] = int(round(avg))
+        return averages
+
+    def iter_observations(self, since: float, until: Optional[float] = None,
+                          window: int = HOUR) -> Iterator[Price]:
+        """Yields every stored observation in [since, until) in time order, across all three tiers.
+
+        Rows are read one `window` of seconds at a time, so memory is bounded by the
+        busiest window rather than the length of the range. Hourly and daily buckets
+        contribute their average prices, timestamped at the start of the bucket.
+        """
+        until = int(until if until is not None else time.time())
+        start = int(since)
+        while start < until:
+            end = min(start + window, until)
+            with self.read_lock:
+                rows = self.read_conn.execute("""
+                    SELECT ts, item_id, quality, city, sell_price, buy_price
+                    FROM price_history WHERE ts >= ? AND ts < ?
+                    UNION ALL
+                    SELECT bucket, item_id, quality, city, CAST(ROUND(sell_avg) AS INTEGER), CAST(ROUND(buy_avg) AS INTEGER)
+                    FROM price_history_hourly WHERE bucket >= ? AND bucket < ?
+                    UNION ALL
+                    SELECT bucket, item_id, quality, city, CAST(ROUND(sell_avg) AS INTEGER), CAST(ROUND(buy_avg) AS INTEGER)
+                    FROM price_history_daily WHERE bucket >= ? AND bucket < ?
+                    ORDER BY 1
+                """, (start, end, start, end, start, end)).fetchall()
+            for ts, item_id, quality, city, sell_price, buy_price in rows:
+                yield Price(item_id, quality, city, sell_price or 0, buy_price or 0, 0, datetime.fromtimestamp(ts))
+            start = end
+
+    def downsample(self, now: float | None = None):
+        """Rolls aged raw rows into hourly buckets, aged hourly into daily, and drops expired daily buckets."""
+        now = int(now if now is not None else time.time())
+        raw_cutoff = now - HISTORY_RAW_RETENTION_HOURS * HOUR
+        raw_cutoff -= raw_cutoff % HOUR  # Only roll up complete hours
+        hourly_cutoff = now - HISTORY_HOURLY_RETENTION_DAYS * DAY
+        hourly_cutoff -= hourly_cutoff % DAY
+        daily_cutoff = now - HISTORY_DAILY_RETENTION_DAYS * DAY
+
+        with self.db.lock, self.db.conn as conn:
+            conn.execute(f"""
+                INSERT INTO price_history_hourly
+                SELECT item_id, quality, city, ts - ts % {HOUR},
+                       MIN(sell_price), MAX(sell_price), AVG(sell_price), COUNT(sell_price),
+                       MIN(buy_price), MAX(buy_price), AVG(buy_price), COUNT(buy_price)
+                FROM price_history
+                WHERE ts < ?
+                GROUP BY item_id, quality, city, ts - ts % {HOUR}
+                {_MERGE_BUCKET}
+            """, (raw_cutoff,))
+            conn.execute("DELETE FROM price_history WHERE ts < ?", (raw_cutoff,))
+
+            conn.execute(f"""
+                INSERT INTO price_history_daily
+                SELECT item_id, quality, city, bucket - bucket % {DAY},
+                       MIN(sell_min), MAX(sell_max),
+                       SUM(sell_avg * sell_count) / NULLIF(SUM(sell_count), 0), SUM(sell_count),
+                       MIN(buy_min), MAX(buy_max),
+                       SUM(buy_avg * buy_count) / NULLIF(SUM(buy_count), 0), SUM(buy_count)
+                FROM price_history_hourly
+                WHERE bucket < ?
+                GROUP BY item_id, quality, city, bucket - bucket % {DAY}
+                {_MERGE_BUCKET}
+            """, (hourly_cutoff,))
+            conn.execute("DELETE FROM price_history_hourly WHERE bucket < ?", (hourly_cutoff,))
+
+            conn.execute("DELETE FROM price_history_daily WHERE bucket < ?", (daily_cutoff,))
@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from config.constants import WRITE_BEHIND_MAX_PENDING, WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_SECONDS, HISTORY_HOUSEKEEPING_SECONDS
+from database.db_manager import DatabaseManager
+from database.price_history import PriceHistoryStore
+from models.price import Price
+from utils.metrics import metrics
+
+class WriteBehindQueue:
+    """Persists prices on a dedicated thread so fetch and compute never wait on disk.
+
+    Pending prices are coalesced per (item_id, quality, city), keeping only the latest.
+    They are flushed once WRITE_BEHIND_BATCH_SIZE keys are pending or WRITE_BEHIND_FLUSH_SECONDS
+    have passed. put() blocks while WRITE_BEHIND_MAX_PENDING keys are waiting. Every
+    `housekeeping_interval` seconds the same thread purges old prices and downsamples the
+    history, so long-running sessions keep the database bounded.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, history: Optional[PriceHistoryStore] = None,
+                 max_pending: int = WRITE_BEHIND_MAX_PENDING, batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+                 flush_interval: float = WRITE_BEHIND_FLUSH_SECONDS,
+                 housekeeping_interval: float = HISTORY_HOUSEKEEPING_SECONDS):
+        self.db_manager = db_manager
+        self.history = history
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.housekeeping_interval = housekeeping_interval
+        # Startup already ran it (MainWindow.initial_sync / HeadlessScanner.sync)
+        self.last_housekeeping = time.monotonic()
+
+        self.pending: Dict[Tuple[str, int, str], Price] = {}
+        self.condition = threading.Condition()
+        self.in_flight = False
+        self.flush_requested = False
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self.thread.start()
+
+    def put(self, prices: Iterable[Price], timeout: Optional[float] = None) -> bool:
+        """Queues prices for persistence. Returns False if the queue stayed full past `timeout`.
+
+        Raises RuntimeError once the queue is closed, since nothing would write them.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("WriteBehindQueue is closed")
+            for price in prices:
+                key = (price.item_id, price.quality, price.city)
+                while key not in self.pending and len(self.pending) >= self.max_pending:
+                    if self.closed:
+                        raise RuntimeError("WriteBehindQueue is closed")
+                    # Backpressure: wait for the writer to drain the queue
+                    self.condition.notify_all()
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        logging.warning("Write-behind queue full, dropping the rest of this batch.")
+                        return False
+                    self.condition.wait(remaining)
+                self.pending[key] = price
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify_all()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until everything queued so far has been written."""
+        with self.condition:
+            self.flush_requested = True
+            self.condition.notify_all()
+            return self.condition.wait_for(lambda: not self.pending and not self.in_flight, timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Writes whatever is still pending and stops the writer thread."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self.closed or self.flush_requested or len(self.pending) >= self.batch_size,
+                    self.flush_interval
+                )
+                self.flush_requested = False
+                if not self.pending:
+                    if self.closed:
+                        return
+                    batch = None
+                else:
+                    batch = list(self.pending.values())
+                    self.pending = {}
+                    self.in_flight = True
+                    # Wake producers blocked on a full queue
+                    self.condition.notify_all()
+
+            if batch is not None:
+                self._write(batch)
+            if time.monotonic() - self.last_housekeeping >= self.housekeeping_interval:
+                self._housekeeping()
+
+    def _write(self, batch: List[Price]):
+        try:
+            with metrics.timer("db_write_seconds"):
+                self.db_manager.save_prices(batch)
+                if self.history is not None:
+                    self.history.record(batch)
+            metrics.inc("db_rows_written_total", len(batch))
+        except Exception as e:
+            logging.error(f"Write-behind flush of {len(batch)} prices failed: {e}")
+        finally:
+            with self.condition:
+                self.in_flight = False
+                self.condition.notify_all()
+
+    def _housekeeping(self):
+        self.last_housekeeping = time.monotonic()
+        try:
+            with metrics.timer("db_housekeeping_seconds"):
+                self.db_manager.purge_old_data()
+                if self.history is not None:
+                    self.history.downsample()
+        except Exception as e:
+            logging.error(f"Price history housekeeping failed: {e}")
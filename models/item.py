@@ -2,7 +2,7 @@
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Item:
     item_id: str
     item_name: str
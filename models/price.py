@@ -1,8 +1,8 @@
-
 from dataclasses import dataclass
 from datetime import datetime
+from typing import Dict
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Price:
     item_id: str
     quality: int
@@ -11,3 +11,16 @@ class Price:
     buy_price: int
     avg_24h: int
     timestamp: datetime
+
+    @classmethod
+    def from_api(cls, row: Dict, timestamp: datetime, avg_24h: int = 0) -> "Price":
+        """Builds a Price from a raw /prices API row."""
+        return cls(
+            item_id=row["item_id"],
+            quality=row["quality"],
+            city=row["city"],
+            sell_price=row["sell_price_min"],
+            buy_price=row["buy_price_max"], # sell_price_max is also available
+            avg_24h=avg_24h, # Not provided by the API, filled from the price history
+            timestamp=timestamp
+        )
@@ -2,7 +2,7 @@
 from dataclasses import dataclass
 from datetime import datetime
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Trade:
     item_id: str
     quality: int
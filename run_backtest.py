@@ -0,0 +1,14 @@
+
+import sys
+import os
+
+# Add the current directory to sys.path
+project_root = os.path.dirname(os.path.abspath(__file__))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Run the backtester over the stored price history or recorded snapshots
+from app.backtest import main
+
+if __name__ == "__main__":
+    sys.exit(main())
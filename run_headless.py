@@ -0,0 +1,14 @@
+
+import sys
+import os
+
+# Add the current directory to sys.path
+project_root = os.path.dirname(os.path.abspath(__file__))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Run the headless scanner; no GUI toolkit is imported
+from app.headless import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,60 +1,214 @@
-
 import requests
 import time
 import logging
-from typing import List, Dict, Optional
-from config.constants import ALBION_API_BASE_URL, ALBION_API_SERVER, API_TIMEOUT, API_RETRIES, API_BACKOFF_FACTOR, MAX_ITEMS_PER_BATCH
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Iterator, Tuple
+from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError
+from config.constants import ALBION_API_BASE_URL, ALBION_API_SERVER, API_TIMEOUT, API_RETRIES, API_BACKOFF_FACTOR
+from config.constants import API_MAX_CONCURRENT_BATCHES, API_RATE_LIMIT_PER_SECOND, API_RATE_LIMIT_BURST
+from services.rate_limiter import TokenBucket
+from services.batch_planner import BatchPlanner
+from services.price_cache import PriceCache
+from services.snapshot_store import SnapshotRecorder
+from utils.metrics import metrics
 
 class APIClient:
-    def __init__(self, base_url: str = ALBION_API_BASE_URL, server: str = ALBION_API_SERVER):
+    def __init__(self, base_url: str = ALBION_API_BASE_URL, server: str = ALBION_API_SERVER,
+                 max_workers: int = API_MAX_CONCURRENT_BATCHES, rate_limiter: Optional[TokenBucket] = None,
+                 planner: Optional[BatchPlanner] = None, cache: Optional[PriceCache] = None,
+                 recorder: Optional[SnapshotRecorder] = None):
         self.base_url = base_url
         self.server = server
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = rate_limiter or TokenBucket(API_RATE_LIMIT_PER_SECOND, API_RATE_LIMIT_BURST)
+        self.planner = planner or BatchPlanner()
+        self.cache = cache
+        self.recorder = recorder
+
+        # Pooled session sized so every worker can keep its connection alive
         self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="api")
 
     def fetch_prices(self, item_ids: List[str], locations: List[str], qualities: List[int]) -> List[Dict]:
         """Fetches market prices for given items, locations, and qualities."""
-        # Max items per batch is 200, but we need to consider locations and qualities too.
-        # The API allows batching items, locations, and qualities in a single request.
-        
-        # Batching items in groups of MAX_ITEMS_PER_BATCH
         all_results = []
-        for i in range(0, len(item_ids), MAX_ITEMS_PER_BATCH):
-            batch_items = item_ids[i:i + MAX_ITEMS_PER_BATCH]
-            results = self._fetch_batch(batch_items, locations, qualities)
+        for _, results, _ in self.iter_prices(item_ids, locations, qualities):
             all_results.extend(results)
-        
+
         return all_results
 
-    def _fetch_batch(self, items: List[str], locations: List[str], qualities: List[int]) -> List[Dict]:
-        """Fetches a single batch of market prices."""
-        items_str = ",".join(items)
-        locations_str = ",".join(locations)
-        qualities_str = ",".join(map(str, qualities))
-        
-        url = f"{self.base_url}prices/{items_str}"
-        params = {
-            "locations": locations_str,
-            "qualities": qualities_str,
+    def iter_prices(self, item_ids: List[str], locations: List[str], qualities: List[int],
+                    use_cache: bool = True) -> Iterator[Tuple[List[str], List[Dict], bool]]:
+        """Yields (batch_items, results, cached) as each concurrently fetched batch completes.
+
+        With a cache attached, items whose entries are all within the TTL are yielded
+        first as a single local batch with cached=True, and only the stale ones hit
+        the network. use_cache=False fetches everything; the responses still refresh
+        the cache.
+        """
+        cached_items, cached_rows = [], []
+        if self.cache is not None and use_cache:
+            cached_rows, item_ids = self.cache.get_fresh(item_ids, locations, qualities)
+            cached_items = list(dict.fromkeys(r["item_id"] for r in cached_rows))
+            if cached_items:
+                logging.info(f"Serving {len(cached_items)} items from the price cache, fetching {len(item_ids)}.")
+            metrics.inc("price_cache_hit_items_total", len(cached_items))
+
+        # The API allows batching items, locations, and qualities in a single request,
+        # but the item list lives in the URL path, so batches are packed by encoded length.
+        overhead = self._url_overhead(locations, qualities)
+        batches = self.planner.plan(item_ids, overhead)
+        if self.max_workers == 1 or len(batches) <= 1:
+            if cached_items:
+                yield cached_items, cached_rows, True
+            for batch_items in batches:
+                yield batch_items, self._fetch_planned(batch_items, locations, qualities), False
+            return
+
+        # Submit the network batches before handing out the cached ones so both overlap
+        # Each worker records into the caller's metrics span
+        futures = {self.executor.submit(metrics.bind(self._fetch_planned), batch_items, locations, qualities): batch_items
+                   for batch_items in batches}
+        try:
+            if cached_items:
+                yield cached_items, cached_rows, True
+            for future in as_completed(futures):
+                yield futures[future], future.result(), False
+        finally:
+            # Consumer stopped early: drop the batches that have not started yet
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        """Stops the worker pool and releases pooled connections."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def _build_params(self, locations: List[str], qualities: List[int]) -> Dict[str, str]:
+        return {
+            "locations": ",".join(locations),
+            "qualities": ",".join(map(str, qualities)),
             "server": self.server
         }
-        
+
+    def _url_overhead(self, locations: List[str], qualities: List[int]) -> int:
+        """Length of the request URL without any item IDs in the path."""
+        return len(f"{self.base_url}prices/?{urlencode(self._build_params(locations, qualities))}")
+
+    def _fetch_planned(self, items: List[str], locations: List[str], qualities: List[int]) -> List[Dict]:
+        """Fetches a batch, splitting it in half and retrying when it is rejected for its length."""
+        url_length = self.planner.url_length(items, self._url_overhead(locations, qualities))
+        results, too_long = self._fetch_batch(items, locations, qualities)
+        if results is not None:
+            self.planner.record_success(url_length)
+            if self.cache is not None:
+                self.cache.store(results)
+            if self.recorder is not None:
+                self.recorder.record(items, locations, qualities, results)
+            return results
+
+        if not too_long:
+            # Rate limits, timeouts and server errors say nothing about the URL; the next scan retries these items
+            logging.error(f"Giving up on a batch of {len(items)} items for this scan.")
+            return []
+
+        if len(items) == 1:
+            logging.error(f"Giving up on {items[0]}: request failed even as a single-item batch.")
+            return []
+
+        self.planner.record_failure(url_length)
+        metrics.inc("api_batch_splits_total")
+        mid = len(items) // 2
+        logging.warning(f"Batch of {len(items)} items failed, retrying as {mid} + {len(items) - mid}.")
+        return self._fetch_planned(items[:mid], locations, qualities) + self._fetch_planned(items[mid:], locations, qualities)
+
+    def _fetch_batch(self, items: List[str], locations: List[str],
+                     qualities: List[int]) -> Tuple[Optional[List[Dict]], bool]:
+        """Fetches a single batch of market prices.
+
+        Returns (results, too_long): results is None if the batch failed, and too_long
+        tells whether the failure looked like a length rejection that a smaller batch
+        may avoid: a 414, a connection dropped before any status, or a 400 for a URL
+        longer than any that worked. Other 400s (e.g. an unknown location) are not.
+        """
+        url = f"{self.base_url}prices/{','.join(items)}"
+        params = self._build_params(locations, qualities)
+        url_length = self.planner.url_length(items, self._url_overhead(locations, qualities))
+        too_long = False
+
         for attempt in range(API_RETRIES):
             try:
-                response = self.session.get(url, params=params, timeout=API_TIMEOUT)
-                
+                with metrics.timer("api_rate_limit_wait_seconds"):
+                    self.rate_limiter.acquire()
+                metrics.inc("api_requests_total")
+                with metrics.timer("api_request_seconds"):
+                    response = self.session.get(url, params=params, timeout=API_TIMEOUT)
+                # Any status at all means the server accepted the request line
+                too_long = False
+
                 if response.status_code == 429:
-                    logging.warning(f"Rate limit exceeded (429). Retrying in {API_BACKOFF_FACTOR * (2 ** attempt)}s...")
-                    time.sleep(API_BACKOFF_FACTOR * (2 ** attempt))
+                    metrics.inc("api_rate_limited_total")
+                    delay = self._retry_after(response) or API_BACKOFF_FACTOR * (2 ** attempt)
+                    logging.warning(f"Rate limit exceeded (429). Retrying in {delay}s...")
+                    # Every worker shares the limiter, so the whole pool backs off together
+                    self.rate_limiter.penalize(delay)
                     continue
-                
+
+                if response.status_code in (400, 414):
+                    # Retrying the same request cannot succeed either way
+                    too_long = response.status_code == 414 or self.planner.longer_than_known_good(url_length)
+                    if too_long:
+                        logging.warning(f"Batch of {len(items)} items rejected as too long ({response.status_code}).")
+                    else:
+                        logging.error(f"Batch of {len(items)} items rejected as a bad request (400): {response.text[:200]}")
+                    return None, too_long
+
                 response.raise_for_status()
-                return response.json()
-                
+                with metrics.timer("api_decode_seconds"):
+                    return response.json(), False
+
             except requests.exceptions.RequestException as e:
                 logging.error(f"API request failed (attempt {attempt + 1}/{API_RETRIES}): {e}")
+                metrics.inc("api_errors_total")
+                too_long = self._dropped_connection(e)
                 if attempt < API_RETRIES - 1:
-                    time.sleep(API_BACKOFF_FACTOR * (2 ** attempt))
-                else:
-                    return []
-        
-        return []
+                    with metrics.timer("api_backoff_seconds"):
+                        time.sleep(API_BACKOFF_FACTOR * (2 ** attempt))
+
+        return None, too_long
+
+    @staticmethod
+    def _dropped_connection(error: Exception) -> bool:
+        """True if the server closed the connection without answering.
+
+        Servers that cannot parse an oversized request line often do that instead of
+        sending a 414. Refused connections and timeouts do not count.
+        """
+        if not isinstance(error, requests.exceptions.ConnectionError) or isinstance(error, requests.exceptions.Timeout):
+            return False
+        return bool(error.args) and isinstance(error.args[0], ProtocolError)
+
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        """Parses a Retry-After header given either in seconds or as an HTTP date."""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
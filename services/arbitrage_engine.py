@@ -2,7 +2,6 @@
 import math
 import logging
 from typing import List, Dict, Optional
-from datetime import datetime
 from config.constants import BLACK_MARKET_CITY_ID, BLACK_MARKET_TRASH_RATE, PREMIUM_TAX_RATE, NON_PREMIUM_TAX_RATE, MIN_ROI_PERCENTAGE, MIN_SPREAD_PERCENTAGE, MIN_VOLUME, MOUNT_CAPACITY
 from models.price import Price
 from models.trade import Trade
@@ -12,6 +11,23 @@ class ArbitrageEngine:
     def __init__(self, use_premium_tax: bool = True):
         self.tax_rate = PREMIUM_TAX_RATE if use_premium_tax else NON_PREMIUM_TAX_RATE
 
+    @staticmethod
+    def is_black_market(city: str) -> bool:
+        return city == "Black Market" or city == BLACK_MARKET_CITY_ID
+
+    def sale_price(self, sell_price_info: Price) -> int:
+        """What one unit sells for at the sell city (Black Market uses buy_price_max)."""
+        if self.is_black_market(sell_price_info.city):
+            return sell_price_info.buy_price # buy_price_max from the API is what we sell to the BM for
+        return sell_price_info.sell_price
+
+    def net_unit_profit(self, buy_cost: float, sell_price_info: Price) -> float:
+        """Profit per unit after the sales tax and, for the Black Market, the trash rate."""
+        unit_profit = (self.sale_price(sell_price_info) * (1 - self.tax_rate)) - buy_cost
+        if self.is_black_market(sell_price_info.city):
+            unit_profit = unit_profit * (1 - BLACK_MARKET_TRASH_RATE)
+        return unit_profit
+
     def calculate_trade(self, item: Item, buy_price_info: Price, sell_price_info: Price) -> Optional[Trade]:
         """Calculates potential profit and ROI for a trade."""
         
@@ -19,20 +35,12 @@ class ArbitrageEngine:
         if buy_price_info.buy_price == 0 or sell_price_info.sell_price == 0:
             return None
         
-        # Determine the correct sell price (Black Market uses buy_price_max)
-        sell_price = sell_price_info.sell_price
-        if sell_price_info.city == "Black Market" or sell_price_info.city == BLACK_MARKET_CITY_ID:
-            sell_price = sell_price_info.buy_price # buy_price_max from the API is what we sell to the BM for
+        sell_price = self.sale_price(sell_price_info)
         
         # Setup Fee (estimated at 1.5% for sell orders, 0 for direct sells)
         setup_fee = 0 # Assume direct sell for simplicity or adjust as needed
         
-        # Unit Profit calculation
-        unit_profit = (sell_price * (1 - self.tax_rate)) - (buy_price_info.sell_price + setup_fee)
-        
-        # Apply Trash Rate for Black Market
-        if sell_price_info.city == "Black Market" or sell_price_info.city == BLACK_MARKET_CITY_ID:
-            unit_profit = unit_profit * (1 - BLACK_MARKET_TRASH_RATE)
+        unit_profit = self.net_unit_profit(buy_price_info.sell_price + setup_fee, sell_price_info)
             
         # ROI calculation
         roi = unit_profit / buy_price_info.sell_price if buy_price_info.sell_price > 0 else 0
@@ -60,5 +68,6 @@ class ArbitrageEngine:
             roi=roi,
             trip_profit=trip_profit,
             silver_per_kg=silver_per_kg,
-            timestamp=datetime.now()
+            # When the quotes were observed, so replaying a recording reproduces the same trades
+            timestamp=max(buy_price_info.timestamp, sell_price_info.timestamp)
         )
@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import AsyncIterator, Awaitable, Dict, Iterator, List, Optional, Tuple
+from config.constants import ALBION_API_BASE_URL, ALBION_API_SERVER, API_TIMEOUT, API_RETRIES, API_BACKOFF_FACTOR
+from config.constants import API_MAX_CONCURRENT_BATCHES, API_RATE_LIMIT_PER_SECOND, API_RATE_LIMIT_BURST
+from services.api_client import APIClient
+from services.rate_limiter import TokenBucket
+from services.batch_planner import BatchPlanner
+from services.price_cache import PriceCache
+from services.snapshot_store import SnapshotRecorder
+from utils.metrics import metrics
+# aiohttp is optional; only the asyncio client needs it
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+class AsyncAPIClient:
+    """asyncio counterpart of APIClient for high-fanout polling.
+
+    Batching, splitting of failed batches, retries and 429 handling behave exactly like
+    APIClient, but batches are coroutines on one event loop instead of worker threads.
+    Cancelling the task that drives fetch_prices() or iter_prices() cancels every
+    in-flight request of that refresh.
+    """
+
+    # URL building and Retry-After parsing are shared with the threaded client
+    _build_params = APIClient._build_params
+    _url_overhead = APIClient._url_overhead
+    _retry_after = staticmethod(APIClient._retry_after)
+
+    def __init__(self, base_url: str = ALBION_API_BASE_URL, server: str = ALBION_API_SERVER,
+                 max_concurrency: int = API_MAX_CONCURRENT_BATCHES, rate_limiter: Optional[TokenBucket] = None,
+                 planner: Optional[BatchPlanner] = None, cache: Optional[PriceCache] = None,
+                 recorder: Optional[SnapshotRecorder] = None):
+        if aiohttp is None:
+            raise ImportError("AsyncAPIClient requires aiohttp (pip install aiohttp).")
+        self.base_url = base_url
+        self.server = server
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limiter = rate_limiter or TokenBucket(API_RATE_LIMIT_PER_SECOND, API_RATE_LIMIT_BURST)
+        self.planner = planner or BatchPlanner()
+        self.cache = cache
+        self.recorder = recorder
+        # Created on first use, since aiohttp sessions belong to the loop they were made on
+        self.session: Optional["aiohttp.ClientSession"] = None
+
+    async def __aenter__(self) -> "AsyncAPIClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        if self.session is None or self.session.closed:
+            # One keep-alive connection per concurrent batch
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.max_concurrency)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=API_TIMEOUT))
+        return self.session
+
+    async def close(self):
+        """Closes the pooled connections."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def fetch_prices(self, item_ids: List[str], locations: List[str], qualities: List[int]) -> List[Dict]:
+        """Fetches market prices for given items, locations, and qualities."""
+        all_results = []
+        async for _, results, _ in self.iter_prices(item_ids, locations, qualities):
+            all_results.extend(results)
+        return all_results
+
+    async def iter_prices(self, item_ids: List[str], locations: List[str], qualities: List[int],
+                          use_cache: bool = True) -> AsyncIterator[Tuple[List[str], List[Dict], bool]]:
+        """Yields (batch_items, results, cached) as each batch completes, cache hits first.
+
+        Leaving the loop early (break, exception or cancellation) cancels the batches
+        still in flight. use_cache=False behaves as in APIClient.iter_prices.
+        """
+        cached_items, cached_rows = [], []
+        if self.cache is not None and use_cache:
+            # SQLite I/O stays off the event loop so in-flight batches keep progressing
+            cached_rows, item_ids = await asyncio.to_thread(self.cache.get_fresh, item_ids, locations, qualities)
+            cached_items = list(dict.fromkeys(r["item_id"] for r in cached_rows))
+            if cached_items:
+                logging.info(f"Serving {len(cached_items)} items from the price cache, fetching {len(item_ids)}.")
+            metrics.inc("price_cache_hit_items_total", len(cached_items))
+
+        batches = self.planner.plan(item_ids, self._url_overhead(locations, qualities))
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(batch_items: List[str]) -> Tuple[List[str], List[Dict], bool]:
+            async with semaphore:
+                return batch_items, await self._fetch_planned(batch_items, locations, qualities), False
+
+        tasks = [asyncio.create_task(run(batch_items)) for batch_items in batches]
+        try:
+            if cached_items:
+                yield cached_items, cached_rows, True
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Let cancelled requests unwind before their connections are reused or closed
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _fetch_planned(self, items: List[str], locations: List[str], qualities: List[int]) -> List[Dict]:
+        """Fetches a batch, splitting it in half and retrying when it is rejected for its length."""
+        url_length = self.planner.url_length(items, self._url_overhead(locations, qualities))
+        results, too_long = await self._fetch_batch(items, locations, qualities)
+        if results is not None:
+            self.planner.record_success(url_length)
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.store, results)
+            if self.recorder is not None:
+                await asyncio.to_thread(self.recorder.record, items, locations, qualities, results)
+            return results
+
+        if not too_long:
+            # Rate limits, timeouts and server errors say nothing about the URL; the next scan retries these items
+            logging.error(f"Giving up on a batch of {len(items)} items for this scan.")
+            return []
+
+        if len(items) == 1:
+            logging.error(f"Giving up on {items[0]}: request failed even as a single-item batch.")
+            return []
+
+        self.planner.record_failure(url_length)
+        metrics.inc("api_batch_splits_total")
+        mid = len(items) // 2
+        logging.warning(f"Batch of {len(items)} items failed, retrying as {mid} + {len(items) - mid}.")
+        first, second = await asyncio.gather(
+            self._fetch_planned(items[:mid], locations, qualities),
+            self._fetch_planned(items[mid:], locations, qualities)
+        )
+        return first + second
+
+    async def _fetch_batch(self, items: List[str], locations: List[str],
+                           qualities: List[int]) -> Tuple[Optional[List[Dict]], bool]:
+        """Fetches a single batch of market prices. Returns (results, too_long) like APIClient._fetch_batch."""
+        url = f"{self.base_url}prices/{','.join(items)}"
+        params = self._build_params(locations, qualities)
+        url_length = self.planner.url_length(items, self._url_overhead(locations, qualities))
+        session = self._get_session()
+        too_long = False
+
+        for attempt in range(API_RETRIES):
+            try:
+                with metrics.timer("api_rate_limit_wait_seconds"):
+                    await self.rate_limiter.acquire_async()
+                metrics.inc("api_requests_total")
+                request_started = time.perf_counter()
+                async with session.get(url, params=params) as response:
+                    metrics.observe("api_request_seconds", time.perf_counter() - request_started)
+                    too_long = False
+                    if response.status == 429:
+                        metrics.inc("api_rate_limited_total")
+                        delay = self._retry_after(response) or API_BACKOFF_FACTOR * (2 ** attempt)
+                        logging.warning(f"Rate limit exceeded (429). Retrying in {delay}s...")
+                        # Shared limiter: every pending batch backs off together
+                        self.rate_limiter.penalize(delay)
+                        continue
+
+                    if response.status in (400, 414):
+                        # Retrying the same request cannot succeed either way
+                        too_long = response.status == 414 or self.planner.longer_than_known_good(url_length)
+                        if too_long:
+                            logging.warning(f"Batch of {len(items)} items rejected as too long ({response.status}).")
+                        else:
+                            logging.error(f"Batch of {len(items)} items rejected as a bad request (400): {(await response.text())[:200]}")
+                        return None, too_long
+
+                    response.raise_for_status()
+                    with metrics.timer("api_decode_seconds"):
+                        return await response.json(content_type=None), False
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                logging.error(f"API request failed (attempt {attempt + 1}/{API_RETRIES}): {e}")
+                metrics.inc("api_errors_total")
+                # Dropped without an answer, as servers do with oversized request lines; refused connections do not count
+                too_long = (isinstance(e, (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError))
+                            and not isinstance(e, aiohttp.ClientConnectorError))
+                if attempt < API_RETRIES - 1:
+                    with metrics.timer("api_backoff_seconds"):
+                        await asyncio.sleep(API_BACKOFF_FACTOR * (2 ** attempt))
+
+        return None, too_long
+
+class EventLoopThread:
+    """Runs an asyncio event loop on a daemon thread so plain threads can drive coroutines.
+
+    submit() returns a concurrent.futures.Future; cancelling it cancels the coroutine.
+    """
+
+    def __init__(self, name: str = "asyncio-loop"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Awaitable) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None):
+        """Runs a coroutine on the loop and blocks the calling thread for its result."""
+        return self.submit(coro).result(timeout)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Cancels whatever is still running and stops the loop."""
+        async def cancel_all():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.loop.is_running():
+            self.submit(cancel_all()).result(timeout)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        self.loop.close()
+
+class BlockingAPIClient:
+    """APIClient's blocking interface over an AsyncAPIClient, so ScanPipeline and
+    RefreshScheduler can use either client.
+
+    The coroutines run on a private EventLoopThread. Closing the iter_prices()
+    generator early cancels the batches still in flight.
+    """
+
+    def __init__(self, client: AsyncAPIClient):
+        self.client = client
+        self.planner = client.planner
+        self.loop_thread = EventLoopThread("async-api-client")
+
+    def _url_overhead(self, locations: List[str], qualities: List[int]) -> int:
+        return self.client._url_overhead(locations, qualities)
+
+    def fetch_prices(self, item_ids: List[str], locations: List[str], qualities: List[int]) -> List[Dict]:
+        return self.loop_thread.run(self.client.fetch_prices(item_ids, locations, qualities))
+
+    def iter_prices(self, item_ids: List[str], locations: List[str], qualities: List[int],
+                    use_cache: bool = True) -> Iterator[Tuple[List[str], List[Dict], bool]]:
+        batches = self.client.iter_prices(item_ids, locations, qualities, use_cache)
+
+        async def next_batch():
+            return await batches.__anext__()
+
+        try:
+            while True:
+                try:
+                    batch = self.loop_thread.run(next_batch())
+                except StopAsyncIteration:
+                    return
+                yield batch
+        finally:
+            self.loop_thread.run(batches.aclose())
+
+    def close(self):
+        self.loop_thread.run(self.client.close())
+        self.loop_thread.stop()
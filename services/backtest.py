@@ -0,0 +1,245 @@
+import math
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from config.constants import MARKET_CITIES, BLACK_MARKET_CITY_NAME, MIN_ROI_PERCENTAGE
+from config.constants import BACKTEST_TRAVEL_MINUTES, BACKTEST_MAX_FILL_WAIT_MINUTES, BACKTEST_MAX_QUOTE_AGE_MINUTES
+from models.item import Item
+from models.price import Price
+from services.arbitrage_engine import ArbitrageEngine
+from services.snapshot_store import Snapshot
+
+@dataclass(slots=True)
+class Position:
+    """A simulated purchase on its way to the sell city."""
+    item_id: str
+    quality: int
+    city_buy: str
+    city_sell: str
+    opened_at: datetime
+    arrives_at: datetime
+    buy_cost: int
+    expected_roi: float
+
+@dataclass(slots=True)
+class Outcome:
+    """How a position ended: realised_roi is None when no sell quote showed up in time."""
+    position: Position
+    closed_at: datetime
+    sale_price: int = 0
+    realised_roi: Optional[float] = None
+
+    @property
+    def filled(self) -> bool:
+        return self.realised_roi is not None
+
+def snapshot_prices(snapshots: Iterable[Snapshot]) -> Iterator[Price]:
+    """Flattens recorded snapshots into observations, timestamped when they were recorded."""
+    for snapshot in snapshots:
+        for row in snapshot.rows:
+            yield Price.from_api(row, snapshot.recorded_at)
+
+class Backtester:
+    """Replays time-ordered price observations as buy -> travel -> sell trades.
+
+    An entry is taken whenever ArbitrageEngine accepts a route on the latest quotes,
+    at most one open position per (item, quality, route). The position is sold at
+    the first sell-city quote seen after the travel delay, with the engine's tax and
+    trash-rate rules. State is the latest quote per (item, quality, city) plus the
+    open positions, so memory does not grow with the length of the history.
+    """
+
+    def __init__(self, engine: ArbitrageEngine, item_resolver: Callable[[str], Optional[Item]],
+                 routes: Optional[Iterable[Tuple[str, str]]] = None,
+                 travel_minutes: float = BACKTEST_TRAVEL_MINUTES,
+                 max_fill_wait_minutes: float = BACKTEST_MAX_FILL_WAIT_MINUTES,
+                 max_quote_age_minutes: float = BACKTEST_MAX_QUOTE_AGE_MINUTES):
+        self.engine = engine
+        self.item_resolver = item_resolver
+        routes = list(dict.fromkeys(routes if routes is not None else [(city, BLACK_MARKET_CITY_NAME) for city in MARKET_CITIES]))
+        self.routes_by_city: Dict[str, List[Tuple[str, str]]] = {}
+        for route in routes:
+            for city in route:
+                self.routes_by_city.setdefault(city, []).append(route)
+        self.travel = timedelta(minutes=travel_minutes)
+        self.max_fill_wait = timedelta(minutes=max_fill_wait_minutes)
+        self.max_quote_age = timedelta(minutes=max_quote_age_minutes)
+
+    def run(self, observations: Iterable[Price]) -> Iterator[Outcome]:
+        """Yields each position's outcome as soon as it is known; leftovers are unfilled at the end."""
+        quotes: Dict[Tuple[str, int], Dict[str, Price]] = {}
+        open_positions: Dict[Tuple[str, int, str, str], Position] = {}
+        # Positions by the quote that can close them: (item_id, quality, city_sell)
+        waiting: Dict[Tuple[str, int, str], List[Position]] = {}
+        items: Dict[str, Optional[Item]] = {}
+        now = None
+
+        for price in observations:
+            now = price.timestamp
+            key = (price.item_id, price.quality)
+            cities = quotes.setdefault(key, {})
+            cities[price.city] = price
+
+            pending = waiting.get((price.item_id, price.quality, price.city))
+            if pending:
+                still_waiting = []
+                for position in pending:
+                    outcome = self._close(position, price)
+                    if outcome is None:
+                        still_waiting.append(position)
+                        continue
+                    del open_positions[(position.item_id, position.quality, position.city_buy, position.city_sell)]
+                    yield outcome
+                if still_waiting:
+                    waiting[(price.item_id, price.quality, price.city)] = still_waiting
+                else:
+                    del waiting[(price.item_id, price.quality, price.city)]
+
+            routes = self.routes_by_city.get(price.city)
+            if not routes:
+                continue
+            if price.item_id not in items:
+                items[price.item_id] = self.item_resolver(price.item_id)
+            item = items[price.item_id]
+            if item is None:
+                continue
+            for city_buy, city_sell in routes:
+                position_key = (price.item_id, price.quality, city_buy, city_sell)
+                if position_key in open_positions:
+                    continue
+                buy_info, sell_info = cities.get(city_buy), cities.get(city_sell)
+                if buy_info is None or sell_info is None:
+                    continue
+                if now - buy_info.timestamp > self.max_quote_age or now - sell_info.timestamp > self.max_quote_age:
+                    continue
+                trade = self.engine.calculate_trade(item, buy_info, sell_info)
+                if trade is None:
+                    continue
+                position = Position(price.item_id, price.quality, city_buy, city_sell, now,
+                                    now + self.travel, buy_info.sell_price, trade.roi)
+                open_positions[position_key] = position
+                waiting.setdefault((price.item_id, price.quality, city_sell), []).append(position)
+
+        # The history ran out before these could be sold
+        for position in open_positions.values():
+            yield Outcome(position, now)
+
+    def _close(self, position: Position, quote: Price) -> Optional[Outcome]:
+        """The outcome of selling `position` into `quote`, or None if it has to keep waiting."""
+        if quote.timestamp < position.arrives_at:
+            return None
+        if quote.timestamp - position.arrives_at > self.max_fill_wait:
+            return Outcome(position, quote.timestamp)
+        sale_price = self.engine.sale_price(quote)
+        if sale_price <= 0:
+            # No buyer at the moment; keep hauling around until the wait runs out
+            return None
+        unit_profit = self.engine.net_unit_profit(position.buy_cost, quote)
+        return Outcome(position, quote.timestamp, sale_price, unit_profit / position.buy_cost)
+
+class RoiDistribution:
+    """Realised ROIs of one group of trades, binned by whole percent so memory stays constant."""
+
+    __slots__ = ("bins", "filled", "unfilled", "roi_sum", "expected_sum", "wins", "survived")
+
+    def __init__(self):
+        self.bins: Counter = Counter()
+        self.filled = 0
+        self.unfilled = 0
+        self.roi_sum = 0.0
+        self.expected_sum = 0.0
+        self.wins = 0  # Realised ROI above zero
+        self.survived = 0  # Still above MIN_ROI_PERCENTAGE after the haul
+
+    def add(self, outcome: Outcome):
+        if not outcome.filled:
+            self.unfilled += 1
+            return
+        roi = outcome.realised_roi
+        self.bins[math.floor(roi * 100)] += 1
+        self.filled += 1
+        self.roi_sum += roi
+        self.expected_sum += outcome.position.expected_roi
+        self.wins += roi > 0
+        self.survived += roi >= MIN_ROI_PERCENTAGE
+
+    def quantile(self, q: float) -> float:
+        """Midpoint of the 1% bin holding the q-quantile."""
+        if not self.filled:
+            return 0.0
+        rank = q * self.filled
+        seen = 0
+        for percent in sorted(self.bins):
+            seen += self.bins[percent]
+            if seen >= rank:
+                return (percent + 0.5) / 100
+        return (max(self.bins) + 0.5) / 100
+
+    def to_dict(self) -> Dict:
+        filled = self.filled or 1
+        return {
+            "trades": self.filled + self.unfilled,
+            "filled": self.filled,
+            "unfilled": self.unfilled,
+            "expected_roi": self.expected_sum / filled,
+            "mean_roi": self.roi_sum / filled,
+            "p10_roi": self.quantile(0.1),
+            "median_roi": self.quantile(0.5),
+            "p90_roi": self.quantile(0.9),
+            "win_rate": self.wins / filled,
+            "survival_rate": self.survived / filled,
+        }
+
+class BacktestReport:
+    """Aggregates outcomes overall, per route and per item as they stream past."""
+
+    def __init__(self):
+        self.overall = RoiDistribution()
+        self.by_route: Dict[str, RoiDistribution] = {}
+        self.by_item: Dict[Tuple[str, int], RoiDistribution] = {}
+        self.first: Optional[datetime] = None
+        self.last: Optional[datetime] = None
+
+    def consume(self, outcomes: Iterable[Outcome]) -> "BacktestReport":
+        for outcome in outcomes:
+            self.add(outcome)
+        return self
+
+    def add(self, outcome: Outcome):
+        position = outcome.position
+        if self.first is None or position.opened_at < self.first:
+            self.first = position.opened_at
+        if outcome.closed_at is not None and (self.last is None or outcome.closed_at > self.last):
+            self.last = outcome.closed_at
+        self.overall.add(outcome)
+        route = f"{position.city_buy} -> {position.city_sell}"
+        self.by_route.setdefault(route, RoiDistribution()).add(outcome)
+        self.by_item.setdefault((position.item_id, position.quality), RoiDistribution()).add(outcome)
+
+    def to_dict(self) -> Dict:
+        return {
+            "first_entry": self.first.isoformat() if self.first else None,
+            "last_exit": self.last.isoformat() if self.last else None,
+            "overall": self.overall.to_dict(),
+            "by_route": {route: d.to_dict() for route, d in sorted(self.by_route.items())},
+            "by_item": [{"item_id": item_id, "quality": quality, **d.to_dict()}
+                        for (item_id, quality), d in sorted(self.by_item.items())]
+        }
+
+    def format_lines(self, top: int) -> List[str]:
+        """Text report: overall, every route, and the `top` items by trade count."""
+        def line(label: str, d: RoiDistribution) -> str:
+            s = d.to_dict()
+            return (f"{label:<40} {s['trades']:>6} {s['unfilled']:>6} {s['expected_roi']:>8.1%} {s['mean_roi']:>8.1%} "
+                    f"{s['p10_roi']:>7.1%} {s['median_roi']:>7.1%} {s['p90_roi']:>7.1%} {s['survival_rate']:>8.1%}")
+
+        header = f"{'':<40} {'trades':>6} {'unfill':>6} {'expected':>8} {'mean':>8} {'p10':>7} {'median':>7} {'p90':>7} {'survived':>8}"
+        lines = [header, line("All trades", self.overall), "", "By route:"]
+        for route, d in sorted(self.by_route.items(), key=lambda kv: kv[1].filled, reverse=True):
+            lines.append(line(route, d))
+        lines += ["", f"Top {top} items by trade count:"]
+        ranked = sorted(self.by_item.items(), key=lambda kv: kv[1].filled + kv[1].unfilled, reverse=True)[:top]
+        for (item_id, quality), d in ranked:
+            lines.append(line(f"{item_id} q{quality}", d))
+        return lines
@@ -0,0 +1,115 @@
+import threading
+import time
+from typing import List
+from urllib.parse import quote
+from config.constants import MAX_ITEMS_PER_BATCH, API_MAX_URL_LENGTH, BATCH_PLANNER_FAILURE_TTL_SUCCESSES
+from config.constants import BATCH_PLANNER_FAILURE_TTL_SECONDS, BATCH_PLANNER_FAILURES_TO_RESET
+
+
+class BatchPlanner:
+    """Packs item IDs into batches by encoded URL length and learns the longest URL that works.
+
+    Only length rejections (414, dropped connections, or a 400 for a URL longer
+    than any that worked) should be recorded as failures. A learned failure expires after BATCH_PLANNER_FAILURE_TTL_SUCCESSES
+    successful batches or BATCH_PLANNER_FAILURE_TTL_SECONDS, so one bad response
+    cannot shrink batches for the rest of the process.
+    """
+
+    def __init__(self, max_url_length: int = API_MAX_URL_LENGTH, max_items: int = MAX_ITEMS_PER_BATCH,
+                 failure_ttl_successes: int = BATCH_PLANNER_FAILURE_TTL_SUCCESSES,
+                 failure_ttl_seconds: float = BATCH_PLANNER_FAILURE_TTL_SECONDS,
+                 failures_to_reset: int = BATCH_PLANNER_FAILURES_TO_RESET):
+        self.max_url_length = max_url_length
+        self.max_items = max_items
+        self.failure_ttl_successes = failure_ttl_successes
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self.failures_to_reset = failures_to_reset
+        self.largest_ok = 0
+        self.smallest_failed = max_url_length + 1
+        self.failed_at = 0.0
+        self.successes_since_failure = 0
+        self.contradicting_failures = 0  # Failures at or below largest_ok since it last worked
+        self.limit = max_url_length
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def encoded_length(item_id: str) -> int:
+        """Byte length of an item ID once percent-encoded in the URL path."""
+        return len(quote(item_id, safe=""))
+
+    def url_length(self, item_ids: List[str], overhead: int) -> int:
+        """Full URL length of a batch, given the length of the URL without any item IDs."""
+        return overhead + sum(self.encoded_length(i) for i in item_ids) + max(0, len(item_ids) - 1)
+
+    def plan(self, item_ids: List[str], overhead: int) -> List[List[str]]:
+        """Splits item_ids into batches whose URL (base + query = `overhead` bytes) fits the learned limit."""
+        with self.lock:
+            self._expire_failure()
+            budget = self.limit - overhead
+
+        batches = []
+        current: List[str] = []
+        used = 0
+        for item_id in item_ids:
+            # Every item after the first costs one extra byte for the comma separator
+            cost = self.encoded_length(item_id) + (1 if current else 0)
+            if current and (used + cost > budget or len(current) >= self.max_items):
+                batches.append(current)
+                current = []
+                used = 0
+                cost -= 1
+            current.append(item_id)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def record_success(self, url_length: int):
+        with self.lock:
+            self.successes_since_failure += 1
+            if url_length >= self.largest_ok:
+                self.contradicting_failures = 0
+            if url_length > self.largest_ok:
+                self.largest_ok = url_length
+                if self.smallest_failed <= url_length:
+                    # A longer URL went through, so the earlier failure was transient
+                    self.smallest_failed = self.max_url_length + 1
+            self._expire_failure()
+            self._update_limit()
+
+    def longer_than_known_good(self, url_length: int) -> bool:
+        """True if a URL this long is past the longest that worked, so a 400 for it may mean "too long"."""
+        with self.lock:
+            return 0 < self.largest_ok < url_length
+
+    def record_failure(self, url_length: int):
+        """Records a batch rejected for its length."""
+        with self.lock:
+            if url_length <= self.largest_ok:
+                # Contradicts a length that worked; only believe it once it keeps happening
+                self.contradicting_failures += 1
+                if self.contradicting_failures < self.failures_to_reset:
+                    return
+                self.largest_ok = 0
+                self.contradicting_failures = 0
+            if url_length < self.smallest_failed:
+                self.smallest_failed = url_length
+            self.failed_at = time.monotonic()
+            self.successes_since_failure = 0
+            self._update_limit()
+
+    def _expire_failure(self):
+        if self.smallest_failed > self.max_url_length:
+            return
+        if (self.successes_since_failure >= self.failure_ttl_successes
+                or time.monotonic() - self.failed_at >= self.failure_ttl_seconds):
+            # Probe upwards again; a real limit is found again within a few batches
+            self.smallest_failed = self.max_url_length + 1
+            self._update_limit()
+
+    def _update_limit(self):
+        # Binary search between the longest URL that worked and the shortest that failed
+        if self.smallest_failed > self.max_url_length:
+            self.limit = self.max_url_length
+        else:
+            self.limit = max(self.largest_ok, (self.largest_ok + self.smallest_failed) // 2)
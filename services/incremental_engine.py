@@ -0,0 +1,131 @@
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from config.constants import MARKET_CITIES, BLACK_MARKET_CITY_NAME, VECTOR_MIN_BATCH_KEYS
+from models.item import Item
+from models.price import Price
+from models.trade import Trade
+from services.arbitrage_engine import ArbitrageEngine
+# numpy is only imported when a vector engine is actually passed in
+if TYPE_CHECKING:
+    from services.vector_engine import VectorArbitrageEngine
+
+TradeKey = Tuple[str, int, str, str]  # (item_id, quality, city_buy, city_sell)
+
+@dataclass
+class TradeDiff:
+    added: List[Trade] = field(default_factory=list)
+    updated: List[Trade] = field(default_factory=list)
+    removed: List[Trade] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.updated or self.removed)
+
+class IncrementalArbitrageEngine:
+    """Keeps the current opportunity set in memory and recomputes only routes touched by changed prices.
+
+    With a vector_engine, batches that change at least VECTOR_MIN_BATCH_KEYS
+    (item, quality) pairs are evaluated by the NumPy kernel in one pass; the
+    resulting diff is the same as the scalar engine's.
+    """
+
+    def __init__(self, engine: ArbitrageEngine, item_resolver: Callable[[str], Optional[Item]],
+                 routes: Optional[Iterable[Tuple[str, str]]] = None,
+                 vector_engine: Optional["VectorArbitrageEngine"] = None):
+        self.engine = engine
+        self.item_resolver = item_resolver
+        self.vector_engine = vector_engine
+        self.prices: Dict[Tuple[str, int], Dict[str, Price]] = {}
+        self.trades: Dict[TradeKey, Trade] = {}
+        # Manual refreshes and the auto-refresh scheduler may apply prices concurrently
+        self.lock = threading.RLock()
+        self.set_routes(routes if routes is not None else [(city, BLACK_MARKET_CITY_NAME) for city in MARKET_CITIES])
+
+    def set_routes(self, routes: Iterable[Tuple[str, str]]):
+        """Replaces the (city_buy, city_sell) routes. Existing opportunities are kept until reset()."""
+        routes = list(dict.fromkeys(routes))
+        routes_by_city: Dict[str, List[Tuple[str, str]]] = {}
+        for route in routes:
+            for city in route:
+                routes_by_city.setdefault(city, []).append(route)
+        with self.lock:
+            self.routes, self.routes_by_city = routes, routes_by_city
+
+    @property
+    def opportunities(self) -> List[Trade]:
+        with self.lock:
+            return list(self.trades.values())
+
+    def reset(self):
+        with self.lock:
+            self.prices.clear()
+            self.trades.clear()
+
+    def apply(self, prices: Iterable[Price]) -> TradeDiff:
+        """Merges new price rows and returns the trades that were added, updated or removed."""
+        with self.lock:
+            return self._apply(prices)
+
+    def _apply(self, prices: Iterable[Price]) -> TradeDiff:
+        changed: Dict[Tuple[str, int], Set[str]] = {}
+        for price in prices:
+            key = (price.item_id, price.quality)
+            cities = self.prices.setdefault(key, {})
+            current = cities.get(price.city)
+            if current and current.sell_price == price.sell_price and current.buy_price == price.buy_price:
+                continue
+            cities[price.city] = price
+            changed.setdefault(key, set()).add(price.city)
+
+        diff = TradeDiff()
+        computed = None
+        if self.vector_engine is not None and len(changed) >= VECTOR_MIN_BATCH_KEYS:
+            computed = self._compute_vector(changed)
+        for (item_id, quality), cities in changed.items():
+            item = self.item_resolver(item_id)
+            if item is None:
+                continue
+            routes = {route for city in cities for route in self.routes_by_city.get(city, ())}
+            for route in routes:
+                key = (item_id, quality, *route)
+                if computed is not None:
+                    self._merge(key, computed.get(key), diff)
+                else:
+                    self._recompute(item, quality, route, diff)
+
+        if diff:
+            logging.debug(f"Incremental update: {len(diff.added)} added, {len(diff.updated)} updated, {len(diff.removed)} removed.")
+        return diff
+
+    def _compute_vector(self, changed: Dict[Tuple[str, int], Set[str]]) -> Dict[TradeKey, Trade]:
+        """Every trade of the changed (item, quality) pairs, over all routes, from one kernel pass."""
+        from services.vector_engine import PriceMatrix
+        matrix = PriceMatrix.from_prices([price for key in changed for price in self.prices[key].values()])
+        items = {item_id: self.item_resolver(item_id) for item_id in matrix.item_ids}
+        trades = self.vector_engine.calculate_trades(
+            matrix, lambda item_id: items[item_id].weight if items[item_id] is not None else None, self.routes)
+        return {(t.item_id, t.quality, t.city_buy, t.city_sell): t for t in trades}
+
+    def _recompute(self, item: Item, quality: int, route: Tuple[str, str], diff: TradeDiff):
+        city_buy, city_sell = route
+        key = (item.item_id, quality, city_buy, city_sell)
+        cities = self.prices[(item.item_id, quality)]
+
+        trade = None
+        if city_buy in cities and city_sell in cities:
+            trade = self.engine.calculate_trade(item, cities[city_buy], cities[city_sell])
+        self._merge(key, trade, diff)
+
+    def _merge(self, key: TradeKey, trade: Optional[Trade], diff: TradeDiff):
+        previous = self.trades.get(key)
+        if trade is None:
+            if previous is not None:
+                del self.trades[key]
+                diff.removed.append(previous)
+        elif previous is None:
+            self.trades[key] = trade
+            diff.added.append(trade)
+        elif (trade.buy_price, trade.sell_price) != (previous.buy_price, previous.sell_price):
+            self.trades[key] = trade
+            diff.updated.append(trade)
@@ -1,49 +1,208 @@
-
+import importlib.util
 import logging
+import threading
 import time
-from typing import Dict, Optional
-from datetime import datetime, timedelta
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
 from config.constants import NOTIFICATION_COOLDOWN_MINUTES, MIN_ROI_PERCENTAGE
+from config.constants import NOTIFICATION_COOLDOWN_MAX_KEYS, NOTIFICATION_COALESCE_SECONDS, NOTIFICATION_MAX_PENDING
+from config.constants import NOTIFICATION_SUMMARY_LINES, NOTIFICATION_WEBHOOK_URL, NOTIFICATION_WEBHOOK_TIMEOUT
 from models.trade import Trade
-# win10toast is for Windows only, we'll use a placeholder if it's not available
-try:
-    from win10toast import ToastNotifier
-except ImportError:
-    ToastNotifier = None
+
+TradeKey = Tuple[str, int, str, str]  # (item_id, quality, city_buy, city_sell)
+
+class CooldownStore:
+    """Last alert time per route, bounded both by age (TTL) and by size (LRU)."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Ordered oldest alert first, so expired and least recent keys sit at the front
+        self.entries: "OrderedDict[TradeKey, float]" = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def allow(self, key: TradeKey, now: float) -> bool:
+        """True, and starts the cooldown, if `key` is not cooling down."""
+        self._expire(now)
+        if key in self.entries:
+            return False
+        self.entries[key] = now
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return True
+
+    def _expire(self, now: float):
+        while self.entries:
+            key, notified_at = next(iter(self.entries.items()))
+            if now - notified_at < self.ttl_seconds:
+                break
+            del self.entries[key]
+
+class NotificationSink(ABC):
+    """Destination for alerts. send() runs on the notification worker and may block."""
+
+    @abstractmethod
+    def send(self, title: str, message: str, trades: List[Trade]):
+        """Delivers one alert; exceptions are logged by the worker."""
+
+class LogSink(NotificationSink):
+    def send(self, title: str, message: str, trades: List[Trade]):
+        logging.info(f"Notification: {title} - {message}")
+
+class ToastSink(NotificationSink):
+    """Windows toast; win10toast is imported on first use since it pulls in pywin32."""
+
+    def __init__(self, duration: int = 10):
+        self.duration = duration
+        self._notifier = None
+
+    @staticmethod
+    def available() -> bool:
+        # win10toast is for Windows only; finding it does not import it (or pywin32)
+        return importlib.util.find_spec("win10toast") is not None
+
+    def send(self, title: str, message: str, trades: List[Trade]):
+        if self._notifier is None:
+            from win10toast import ToastNotifier
+            self._notifier = ToastNotifier()
+        self._notifier.show_toast(title, message, duration=self.duration)
+
+class WebhookSink(NotificationSink):
+    """POSTs each alert as JSON, e.g. to a local bot or dashboard."""
+
+    def __init__(self, url: str, timeout: float = NOTIFICATION_WEBHOOK_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, title: str, message: str, trades: List[Trade]):
+        import requests
+
+        payload = {
+            "title": title,
+            "message": message,
+            "trades": [{
+                "item_id": t.item_id, "quality": t.quality, "city_buy": t.city_buy, "city_sell": t.city_sell,
+                "buy_price": t.buy_price, "sell_price": t.sell_price, "unit_profit": t.unit_profit,
+                "roi": t.roi, "timestamp": t.timestamp.isoformat()
+            } for t in trades]
+        }
+        response = requests.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+def default_sinks() -> List[NotificationSink]:
+    sinks: List[NotificationSink] = [ToastSink()] if ToastSink.available() else [LogSink()]
+    if NOTIFICATION_WEBHOOK_URL:
+        sinks.append(WebhookSink(NOTIFICATION_WEBHOOK_URL))
+    return sinks
 
 class NotificationService:
-    def __init__(self):
-        self.notifier = ToastNotifier() if ToastNotifier else None
-        self.cooldown_dict: Dict[str, datetime] = {}
+    """Non-blocking alerts: notify_trade() only queues, a worker thread delivers.
 
-    def notify_trade(self, trade: Trade):
-        """Triggers a notification for a profitable trade."""
-        if trade.roi < MIN_ROI_PERCENTAGE:
-            return
+    Trades queued within NOTIFICATION_COALESCE_SECONDS of the first one are merged into
+    a single summary (one trade keeps the detailed message). Routes alerted within
+    NOTIFICATION_COOLDOWN_MINUTES are skipped, tracked in a bounded CooldownStore.
+    Sink failures are logged and never reach the refresh thread.
+    """
+
+    def __init__(self, sinks: Optional[List[NotificationSink]] = None,
+                 coalesce_seconds: float = NOTIFICATION_COALESCE_SECONDS, max_pending: int = NOTIFICATION_MAX_PENDING):
+        self.sinks = sinks if sinks is not None else default_sinks()
+        self.coalesce_seconds = coalesce_seconds
+        self.max_pending = max_pending
+        self.cooldowns = CooldownStore(NOTIFICATION_COOLDOWN_MINUTES * 60, NOTIFICATION_COOLDOWN_MAX_KEYS)
 
-        item_key = f"{trade.item_id}_{trade.quality}_{trade.city_buy}_{trade.city_sell}"
-        now = datetime.now()
+        # Latest trade per route waiting for the worker
+        self.pending: Dict[TradeKey, Trade] = {}
+        self.first_pending_at: Optional[float] = None
+        self.condition = threading.Condition()
+        self.closed = False
+        # Started on the first alert so constructing the service stays free
+        self.thread: Optional[threading.Thread] = None
 
-        # Check cooldown
-        if item_key in self.cooldown_dict:
-            last_notified = self.cooldown_dict[item_key]
-            if now - last_notified < timedelta(minutes=NOTIFICATION_COOLDOWN_MINUTES):
+    def notify_trade(self, trade: Trade):
+        """Queues a notification for a profitable trade."""
+        self.notify_trades([trade])
+
+    def notify_trades(self, trades: Iterable[Trade]):
+        """Queues notifications for several trades without blocking."""
+        with self.condition:
+            if self.closed:
                 return
+            queued = False
+            for trade in trades:
+                if trade.roi < MIN_ROI_PERCENTAGE:
+                    continue
+                key = (trade.item_id, trade.quality, trade.city_buy, trade.city_sell)
+                if key not in self.pending and len(self.pending) >= self.max_pending:
+                    logging.debug("Notification queue full, dropping alert.")
+                    continue
+                self.pending[key] = trade
+                queued = True
+            if not queued:
+                return
+            if self.first_pending_at is None:
+                self.first_pending_at = time.monotonic()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="notifications", daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def close(self, timeout: Optional[float] = None):
+        """Delivers what is already queued and stops the worker."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout)
 
-        # Prepare notification content
-        title = f"Arbitrage Alert: {trade.item_id}"
-        message = (f"Buy: {trade.city_buy} ({trade.buy_price})\n"
-                   f"Sell: {trade.city_sell} ({trade.sell_price})\n"
-                   f"ROI: {trade.roi:.2%}, Profit: {trade.unit_profit:.0f}")
+    def _run(self):
+        while True:
+            with self.condition:
+                # Wait for the first alert, then let the burst build up for the coalescing window
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                while self.pending and not self.closed:
+                    remaining = self.first_pending_at + self.coalesce_seconds - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if not self.pending and self.closed:
+                    return
+                trades = list(self.pending.values())
+                self.pending = {}
+                self.first_pending_at = None
+            self._dispatch(trades)
 
-        # Send notification
-        if self.notifier:
+    def _dispatch(self, trades: List[Trade]):
+        now = time.monotonic()
+        trades = [t for t in trades if self.cooldowns.allow((t.item_id, t.quality, t.city_buy, t.city_sell), now)]
+        if not trades:
+            return
+        trades.sort(key=lambda t: t.roi, reverse=True)
+        title, message = self.format_alert(trades)
+        for sink in self.sinks:
             try:
-                self.notifier.show_toast(title, message, duration=10)
-                logging.info(f"Notification sent for {item_key}: {title}")
-                self.cooldown_dict[item_key] = now
+                sink.send(title, message, trades)
             except Exception as e:
-                logging.error(f"Failed to send notification: {e}")
-        else:
-            logging.info(f"Notification (Simulation): {title} - {message}")
-            self.cooldown_dict[item_key] = now
+                logging.error(f"Failed to send notification via {type(sink).__name__}: {e}")
+        logging.info(f"Notification sent for {len(trades)} trade(s): {title}")
+
+    @staticmethod
+    def format_alert(trades: List[Trade]) -> Tuple[str, str]:
+        """Title and body for trades sorted best ROI first."""
+        if len(trades) == 1:
+            trade = trades[0]
+            title = f"Arbitrage Alert: {trade.item_id}"
+            message = (f"Buy: {trade.city_buy} ({trade.buy_price})\n"
+                       f"Sell: {trade.city_sell} ({trade.sell_price})\n"
+                       f"ROI: {trade.roi:.2%}, Profit: {trade.unit_profit:.0f}")
+            return title, message
+
+        title = f"{len(trades)} new trades, best ROI {trades[0].roi:.0%}"
+        lines = [f"{t.item_id} {t.city_buy} -> {t.city_sell}: {t.roi:.1%}" for t in trades[:NOTIFICATION_SUMMARY_LINES]]
+        if len(trades) > NOTIFICATION_SUMMARY_LINES:
+            lines.append(f"... and {len(trades) - NOTIFICATION_SUMMARY_LINES} more")
+        return title, "\n".join(lines)
@@ -0,0 +1,119 @@
+import sqlite3
+import os
+import json
+import time
+import threading
+from typing import List, Dict, Tuple, Iterable
+from config.constants import PRICE_CACHE_NAME, PRICE_CACHE_TTL_SECONDS, PRICE_CACHE_MAX_ENTRIES
+
+# SQLite's default limit on bound parameters is 999
+_QUERY_CHUNK = 900
+
+class PriceCache:
+    """On-disk cache of /prices rows keyed by (item, location, quality) with TTL freshness and LRU eviction."""
+
+    def __init__(self, db_path=None, ttl_seconds: float = PRICE_CACHE_TTL_SECONDS, max_entries: int = PRICE_CACHE_MAX_ENTRIES):
+        if db_path is None:
+            project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+            db_path = os.path.join(project_root, PRICE_CACHE_NAME)
+
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        # Shared by the API worker threads, so every access goes through self.lock
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._initialize_db()
+
+    def _initialize_db(self):
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS price_cache (
+                    item_id TEXT,
+                    location TEXT,
+                    quality INTEGER,
+                    payload TEXT,
+                    sell_price_min_date TEXT,
+                    buy_price_max_date TEXT,
+                    fetched_at REAL,
+                    last_access REAL,
+                    PRIMARY KEY (item_id, location, quality)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_price_cache_lru ON price_cache (last_access)")
+            self.conn.commit()
+
+    def get_fresh(self, item_ids: List[str], locations: List[str], qualities: List[int]) -> Tuple[List[Dict], List[str]]:
+        """Returns (cached rows, item IDs to re-fetch).
+
+        An item is served from the cache only if every requested (location, quality)
+        entry exists and was fetched within the TTL.
+        """
+        now = time.time()
+        threshold = now - self.ttl_seconds
+        wanted = {(loc, q) for loc in locations for q in qualities}
+        found: Dict[str, Dict[Tuple[str, int], str]] = {}
+
+        with self.lock:
+            for i in range(0, len(item_ids), _QUERY_CHUNK):
+                chunk = item_ids[i:i + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self.conn.execute(f"""
+                    SELECT item_id, location, quality, payload FROM price_cache
+                    WHERE item_id IN ({placeholders}) AND fetched_at >= ?
+                """, (*chunk, threshold))
+                for item_id, location, quality, payload in cursor:
+                    if (location, quality) in wanted:
+                        found.setdefault(item_id, {})[(location, quality)] = payload
+
+            fresh_ids = [item_id for item_id in item_ids if len(found.get(item_id, ())) == len(wanted)]
+            for i in range(0, len(fresh_ids), _QUERY_CHUNK):
+                chunk = fresh_ids[i:i + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                self.conn.execute(f"UPDATE price_cache SET last_access = ? WHERE item_id IN ({placeholders})", (now, *chunk))
+            self.conn.commit()
+
+        rows = [json.loads(payload) for item_id in fresh_ids for payload in found[item_id].values()]
+        fresh = set(fresh_ids)
+        stale_ids = [item_id for item_id in item_ids if item_id not in fresh]
+        return rows, stale_ids
+
+    def store(self, rows: Iterable[Dict]):
+        """Upserts freshly fetched API rows and evicts the least recently used entries over capacity."""
+        now = time.time()
+        records = [
+            (r["item_id"], r["city"], r["quality"], json.dumps(r),
+             r.get("sell_price_min_date"), r.get("buy_price_max_date"), now, now)
+            for r in rows
+        ]
+        if not records:
+            return
+
+        with self.lock:
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO price_cache
+                    (item_id, location, quality, payload, sell_price_min_date, buy_price_max_date, fetched_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, records)
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM price_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute("""
+                DELETE FROM price_cache WHERE rowid IN (
+                    SELECT rowid FROM price_cache ORDER BY last_access LIMIT ?
+                )
+            """, (excess,))
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM price_cache")
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every API worker, threaded or asyncio."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.last_refill
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.last_refill = now
+
+    def try_acquire(self) -> float:
+        """Takes a token if one is available. Returns 0, or the seconds to wait before trying again."""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Blocks until a request token is available."""
+        while (wait := self.try_acquire()) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Waits for a request token without blocking the event loop."""
+        while (wait := self.try_acquire()) > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self, delay: float):
+        """Pauses every worker for `delay` seconds (e.g. after a 429 Retry-After)."""
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + delay)
+            self.tokens = 0.0
+            self.last_refill = self.blocked_until
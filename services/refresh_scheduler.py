@@ -0,0 +1,138 @@
+import heapq
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from config.constants import SCHEDULER_INTERVAL_SECONDS, SCHEDULER_REQUESTS_PER_CYCLE, SCHEDULER_STALE_SECONDS
+from config.constants import SCHEDULER_VOLATILITY_WEIGHT, SCHEDULER_PROFIT_WEIGHT, SCHEDULER_EWMA_ALPHA
+from services.scan_pipeline import ScanPipeline, BatchResult
+
+class ItemStats:
+    __slots__ = ("last_refreshed", "volatility", "profitability")
+
+    def __init__(self):
+        self.last_refreshed: Optional[float] = None
+        self.volatility = 0.0
+        self.profitability = 0.0
+
+class RefreshScheduler:
+    """Continuously re-polls the items most likely to yield trades within a fixed API budget.
+
+    Every cycle each candidate item gets a priority of
+    (age / SCHEDULER_STALE_SECONDS) * (1 + w_v * volatility + w_p * profitability).
+    Items never fetched come first. The top items are then packed by the API client's
+    batch planner, and only the first SCHEDULER_REQUESTS_PER_CYCLE batches are fetched.
+    Volatility and profitability are exponentially weighted averages of the relative
+    price moves and the best ROI seen for the item.
+    """
+
+    def __init__(self, pipeline: ScanPipeline, items_source: Callable[[], List[str]],
+                 locations_source: Callable[[], List[str]], qualities: List[int],
+                 on_result: Callable[[BatchResult], None],
+                 interval: float = SCHEDULER_INTERVAL_SECONDS, requests_per_cycle: int = SCHEDULER_REQUESTS_PER_CYCLE):
+        self.pipeline = pipeline
+        self.items_source = items_source
+        self.locations_source = locations_source
+        self.qualities = qualities
+        self.on_result = on_result
+        self.interval = interval
+        self.requests_per_cycle = requests_per_cycle
+
+        self.stats: Dict[str, ItemStats] = {}
+        self.last_prices: Dict[Tuple[str, int, str], Tuple[int, int]] = {}
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        # A thread that was asked to stop but is still finishing its batch simply carries on
+        self.stop_event.clear()
+        if self.running:
+            return
+        self.thread = threading.Thread(target=self._run, name="refresh-scheduler", daemon=True)
+        self.thread.start()
+        logging.info("Auto-refresh scheduler started.")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stops after the batch in flight; the remaining batches of the cycle are dropped."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        logging.info("Auto-refresh scheduler stopped.")
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            started = time.monotonic()
+            try:
+                self.run_cycle()
+            except Exception as e:
+                logging.error(f"Auto-refresh cycle failed: {e}")
+            self.stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def priority(self, item_id: str, now: float) -> float:
+        stats = self.stats.get(item_id)
+        if stats is None or stats.last_refreshed is None:
+            return float("inf")
+        age = (now - stats.last_refreshed) / SCHEDULER_STALE_SECONDS
+        return age * (1 + SCHEDULER_VOLATILITY_WEIGHT * stats.volatility + SCHEDULER_PROFIT_WEIGHT * stats.profitability)
+
+    def select_items(self) -> List[str]:
+        """Highest-priority items that fit in this cycle's request budget."""
+        candidates = self.items_source()
+        if not candidates:
+            return []
+        now = time.monotonic()
+        api_client = self.pipeline.api_client
+        planner = api_client.planner
+        locations = self.locations_source()
+
+        # Never rank more items than the budget could possibly carry
+        upper_bound = self.requests_per_cycle * planner.max_items
+        ranked = heapq.nlargest(upper_bound, candidates, key=lambda item_id: self.priority(item_id, now))
+        batches = planner.plan(ranked, api_client._url_overhead(locations, self.qualities))
+        return [item_id for batch in batches[:self.requests_per_cycle] for item_id in batch]
+
+    def run_cycle(self):
+        item_ids = self.select_items()
+        if not item_ids:
+            return
+        refreshed_at = time.monotonic()
+        # Cached rows would show these items as unchanged and spend the budget on nothing
+        for result in self.pipeline.scan(item_ids, self.locations_source(), self.qualities,
+                                         use_cache=False, span_name="scheduled refresh"):
+            # Items of failed batches keep their age, so they stay at the front of the queue
+            for item_id in {price.item_id for price in result.prices}:
+                self.stats.setdefault(item_id, ItemStats()).last_refreshed = refreshed_at
+            self._learn(result)
+            self.on_result(result)
+            if self.stop_event.is_set():
+                break
+
+    def _learn(self, result: BatchResult):
+        """Updates volatility and profitability estimates from one batch."""
+        moves: Dict[str, float] = {}
+        for price in result.prices:
+            key = (price.item_id, price.quality, price.city)
+            previous = self.last_prices.get(key)
+            self.last_prices[key] = (price.sell_price, price.buy_price)
+            move = moves.get(price.item_id, 0.0)
+            if previous is not None:
+                for old, new in zip(previous, (price.sell_price, price.buy_price)):
+                    if old and new:
+                        move = max(move, abs(new - old) / old)
+            moves[price.item_id] = move
+
+        best_roi: Dict[str, float] = {trade.item_id: 0.0 for trade in result.diff.removed}
+        for trade in result.diff.added + result.diff.updated:
+            best_roi[trade.item_id] = max(best_roi.get(trade.item_id, 0.0), trade.roi)
+
+        alpha = SCHEDULER_EWMA_ALPHA
+        for item_id, move in moves.items():
+            stats = self.stats.setdefault(item_id, ItemStats())
+            stats.volatility = (1 - alpha) * stats.volatility + alpha * move
+            # Items whose trades were unchanged keep their estimate; vanished ones decay towards 0
+            if item_id in best_roi:
+                stats.profitability = (1 - alpha) * stats.profitability + alpha * best_roi.get(item_id, 0.0)
@@ -0,0 +1,26 @@
+import itertools
+from typing import List, Tuple
+from config.constants import MARKET_CITIES, BLACK_MARKET_CITY_NAME, ROUTE_INCLUDE_ALL_CITY_PAIRS
+from data.flip_loader import FlipLoader
+from services.arbitrage_engine import ArbitrageEngine
+
+class RouteEngine:
+    """The configured city -> city routes; IncrementalArbitrageEngine evaluates them."""
+
+    def __init__(self, engine: ArbitrageEngine, flip_loader: FlipLoader, include_all_city_pairs: bool = ROUTE_INCLUDE_ALL_CITY_PAIRS):
+        self.engine = engine
+        self.flip_loader = flip_loader
+        self.include_all_city_pairs = include_all_city_pairs
+
+    def routes(self) -> List[Tuple[str, str]]:
+        """Flip pairs from flips.json, plus every market city pair when enabled."""
+        routes = [(f["city_buy"], f["city_sell"]) for f in self.flip_loader.flips]
+        if self.include_all_city_pairs:
+            # The Black Market only buys, so it is never the buy side of a route
+            routes.extend(itertools.permutations(MARKET_CITIES, 2))
+            routes.extend((city, BLACK_MARKET_CITY_NAME) for city in MARKET_CITIES)
+        return list(dict.fromkeys(routes))
+
+    def locations(self) -> List[str]:
+        """Every city that appears in a route, i.e. what the API has to be queried for."""
+        return list(dict.fromkeys(city for route in self.routes() for city in route))
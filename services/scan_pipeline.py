@@ -0,0 +1,107 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+from models.price import Price
+from services.api_client import APIClient
+from services.incremental_engine import IncrementalArbitrageEngine, TradeDiff
+from services.snapshot_store import Snapshot
+from utils.metrics import metrics
+
+@dataclass
+class BatchResult:
+    """Outcome of one API batch as it moves through the pipeline."""
+    items_done: int
+    items_total: int
+    diff: TradeDiff
+    prices: List[Price] = field(default_factory=list)
+
+class ScanPipeline:
+    """fetch -> parse -> compute, yielding each batch's trade changes as soon as they are known.
+
+    Persistence and notifications are optional hooks, so the GUI and headless runners
+    share one implementation.
+    """
+
+    def __init__(self, api_client: APIClient, incremental_engine: IncrementalArbitrageEngine,
+                 price_history=None, write_behind=None, notification_service=None):
+        self.api_client = api_client
+        self.incremental_engine = incremental_engine
+        self.price_history = price_history
+        self.write_behind = write_behind
+        self.notification_service = notification_service
+
+    def scan(self, item_ids: List[str], locations: List[str], qualities: List[int],
+             use_cache: bool = True, span_name: str = "refresh") -> Iterator[BatchResult]:
+        """Yields a BatchResult per API batch, in completion order.
+
+        use_cache=False skips the response cache; span_name labels this scan in the metrics.
+        """
+        items_done = 0
+        # Finished when the consumer is done with the generator, so the span covers the whole refresh
+        span = metrics.start_span(span_name)
+        try:
+            # Batches run concurrently and arrive in completion order
+            for batch, rows, cached in self.api_client.iter_prices(item_ids, locations, qualities, use_cache):
+                prices = self.parse_rows(rows)
+                # Cached rows were persisted when they were fetched; storing them again would re-date old quotes
+                diff = self.process_prices(prices, persist=not cached)
+                items_done += len(batch)
+                yield BatchResult(items_done, len(item_ids), diff, prices)
+        finally:
+            if span is not None:
+                span.finish()
+
+    def replay(self, snapshots: Iterable[Snapshot]) -> Iterator[BatchResult]:
+        """Feeds recorded batches through parse and compute as fast as they can be read.
+
+        Prices keep the time they were recorded at. items_total is 0 since a
+        recording's length is not known up front.
+        """
+        items_done = 0
+        span = metrics.start_span("replay")
+        try:
+            for snapshot in snapshots:
+                prices = self.parse_rows(snapshot.rows, snapshot.recorded_at)
+                diff = self.process_prices(prices)
+                items_done += len(snapshot.items)
+                yield BatchResult(items_done, 0, diff, prices)
+        finally:
+            if span is not None:
+                span.finish()
+
+    def process_rows(self, rows: List[Dict]) -> TradeDiff:
+        """Parses raw API rows and runs them through persistence and compute."""
+        return self.process_prices(self.parse_rows(rows))
+
+    def parse_rows(self, rows: List[Dict], timestamp: Optional[datetime] = None) -> List[Price]:
+        """Builds Price objects, with avg_24h filled from the price history when available."""
+        with metrics.timer("pipeline_parse_seconds"):
+            now = timestamp or datetime.now()
+            averages: Dict = {}
+            if self.price_history is not None:
+                averages = self.price_history.get_avg_24h(r["item_id"] for r in rows)
+            return [Price.from_api(r, now, averages.get((r["item_id"], r["quality"], r["city"]), 0)) for r in rows]
+
+    def process_prices(self, prices: List[Price], persist: bool = True) -> TradeDiff:
+        """Queues prices for persistence (unless persist is False) and recomputes the routes they touch."""
+        metrics.inc("prices_processed_total", len(prices))
+        if self.write_behind is not None and persist:
+            # Persisted off this thread by the write-behind queue; the timer shows backpressure
+            with metrics.timer("pipeline_persist_enqueue_seconds"):
+                self.write_behind.put(prices)
+
+        # Only routes touching changed prices are recomputed
+        with metrics.timer("pipeline_compute_seconds"):
+            diff = self.incremental_engine.apply(prices)
+        metrics.inc("trades_added_total", len(diff.added))
+        metrics.inc("trades_updated_total", len(diff.updated))
+        metrics.inc("trades_removed_total", len(diff.removed))
+
+        if self.notification_service is not None:
+            # Only queues; delivery happens on the notification worker
+            self.notification_service.notify_trades(diff.added + diff.updated)
+
+        if diff:
+            logging.debug(f"Batch of {len(prices)} prices: {len(diff.added)} new, {len(diff.updated)} updated, {len(diff.removed)} removed trades.")
+        return diff
@@ -0,0 +1,91 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from config.constants import SNAPSHOT_COMPRESSION_LEVEL
+
+@dataclass(slots=True)
+class Snapshot:
+    """One recorded API batch: the request it answered and the raw /prices rows."""
+    recorded_at: datetime
+    items: List[str]
+    locations: List[str]
+    qualities: List[int]
+    rows: List[Dict]
+
+class SnapshotRecorder:
+    """Appends raw batch responses to a gzip-compressed JSON Lines file.
+
+    Each process appends a new gzip member, which readers see as one continuous
+    stream. Every record is sync-flushed, so a crash loses at most the record being
+    written and replay stops cleanly at the truncated tail. Safe to share between
+    the API worker threads.
+    """
+
+    def __init__(self, path: str, compression_level: int = SNAPSHOT_COMPRESSION_LEVEL):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = gzip.open(path, "ab", compresslevel=compression_level)
+        self.records = 0
+
+    def record(self, items: List[str], locations: List[str], qualities: List[int], rows: List[Dict],
+               recorded_at: Optional[float] = None):
+        line = json.dumps({
+            "t": time.time() if recorded_at is None else recorded_at,
+            "items": items, "locations": locations, "qualities": qualities, "rows": rows
+        }, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(line)
+            self.file.flush(zlib.Z_SYNC_FLUSH)
+            self.records += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+class SnapshotReplaySource:
+    """Streams recorded snapshots back in file order, one line at a time.
+
+    Files are read in the order given, so pass them oldest first. Nothing is
+    throttled: replay runs as fast as the consumer pulls.
+    """
+
+    def __init__(self, paths: List[str], since: Optional[datetime] = None, until: Optional[datetime] = None):
+        self.paths = paths
+        self.since = since.timestamp() if since is not None else None
+        self.until = until.timestamp() if until is not None else None
+
+    def __iter__(self) -> Iterator[Snapshot]:
+        for path in self.paths:
+            yield from self._read(path)
+
+    def _read(self, path: str) -> Iterator[Snapshot]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Partial last line of a recording that was cut off
+                        logging.warning(f"Skipping a malformed snapshot record in {path}.")
+                        continue
+                    t = record["t"]
+                    if (self.since is not None and t < self.since) or (self.until is not None and t >= self.until):
+                        continue
+                    yield Snapshot(datetime.fromtimestamp(t), record["items"], record["locations"],
+                                   record["qualities"], record["rows"])
+        except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+            logging.warning(f"Snapshot file {path} ends early ({e}); replayed everything before that point.")
@@ -0,0 +1,191 @@
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from config.constants import BLACK_MARKET_CITY_ID, BLACK_MARKET_CITY_NAME, BLACK_MARKET_TRASH_RATE, MIN_ROI_PERCENTAGE, MIN_SPREAD_PERCENTAGE, MOUNT_CAPACITY
+from models.item import Item
+from models.price import Price
+from models.trade import Trade
+from services.arbitrage_engine import ArbitrageEngine
+# numpy is optional; without it the batch mode falls back to the scalar engine
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class PriceMatrix:
+    """Columnar price snapshot shaped items × qualities × cities.
+
+    This is the bulk container for whole snapshots: two int64 prices and a
+    presence flag per cell, with item IDs, qualities and cities stored once.
+    """
+
+    def __init__(self, item_ids: List[str], qualities: List[int], cities: List[str]):
+        self.item_ids = item_ids
+        self.qualities = qualities
+        self.cities = cities
+        self.item_index = {item_id: i for i, item_id in enumerate(item_ids)}
+        self.quality_index = {quality: i for i, quality in enumerate(qualities)}
+        self.city_index = {city: i for i, city in enumerate(cities)}
+
+        shape = (len(item_ids), len(qualities), len(cities))
+        self.sell_price = np.zeros(shape, dtype=np.int64)
+        self.buy_price = np.zeros(shape, dtype=np.int64)
+        self.present = np.zeros(shape, dtype=bool)
+        # Observation times, stored once in ascending order; cells hold an index into them
+        self.timestamps: List[datetime] = []
+        self.observed = np.zeros(shape, dtype=np.int64)
+
+    def nbytes(self) -> int:
+        """Size of the column storage."""
+        return self.sell_price.nbytes + self.buy_price.nbytes + self.present.nbytes + self.observed.nbytes
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict], timestamp: Optional[datetime] = None) -> "PriceMatrix":
+        """Loads raw /prices API rows without creating a Price per row, all observed at `timestamp` (default now)."""
+        timestamp = timestamp or datetime.now()
+        return cls._build(rows, lambda r: (r["item_id"], r["quality"], r["city"], r["sell_price_min"], r["buy_price_max"], timestamp))
+
+    @classmethod
+    def from_prices(cls, prices: List[Price]) -> "PriceMatrix":
+        return cls._build(prices, lambda p: (p.item_id, p.quality, p.city, p.sell_price, p.buy_price, p.timestamp))
+
+    @classmethod
+    def _build(cls, records, unpack) -> "PriceMatrix":
+        # Later rows win, as in the scalar path's price_map. Duplicates are dropped here because
+        # numpy leaves the winner of repeated indices in one fancy assignment unspecified.
+        latest = {}
+        for r in records:
+            c = unpack(r)
+            latest[c[:3]] = c
+        columns = list(latest.values())
+        matrix = cls(
+            list(dict.fromkeys(c[0] for c in columns)),
+            sorted({c[1] for c in columns}),
+            list(dict.fromkeys(c[2] for c in columns))
+        )
+        if not columns:
+            return matrix
+
+        item_idx = np.fromiter((matrix.item_index[c[0]] for c in columns), dtype=np.intp, count=len(columns))
+        quality_idx = np.fromiter((matrix.quality_index[c[1]] for c in columns), dtype=np.intp, count=len(columns))
+        city_idx = np.fromiter((matrix.city_index[c[2]] for c in columns), dtype=np.intp, count=len(columns))
+        matrix.sell_price[item_idx, quality_idx, city_idx] = np.fromiter((c[3] for c in columns), dtype=np.int64, count=len(columns))
+        matrix.buy_price[item_idx, quality_idx, city_idx] = np.fromiter((c[4] for c in columns), dtype=np.int64, count=len(columns))
+        matrix.present[item_idx, quality_idx, city_idx] = True
+        matrix.timestamps = sorted({c[5] for c in columns})
+        order = {timestamp: i for i, timestamp in enumerate(matrix.timestamps)}
+        matrix.observed[item_idx, quality_idx, city_idx] = np.fromiter((order[c[5]] for c in columns), dtype=np.int64, count=len(columns))
+        return matrix
+
+class VectorArbitrageEngine:
+    """Batch variant of ArbitrageEngine.calculate_trade over a whole price snapshot.
+
+    Results are identical to calling the scalar engine for every (item, quality, route):
+    the float operations are applied in the same order, and Trade objects are only
+    built for rows that pass the ROI and spread thresholds.
+    """
+
+    def __init__(self, engine: ArbitrageEngine):
+        self.engine = engine
+
+    def calculate_trades(self, matrix: PriceMatrix, weight_of: Callable[[str], Optional[float]],
+                         routes: Iterable[Tuple[str, str]]) -> List[Trade]:
+        """Returns profitable trades for every item × quality × route in the matrix.
+
+        `weight_of` returns an item's weight, or None for items without metadata (skipped).
+        """
+        routes = [r for r in routes if r[0] in matrix.city_index and r[1] in matrix.city_index]
+        if not routes or not matrix.item_ids or not matrix.qualities:
+            return []
+
+        weights = [weight_of(item_id) for item_id in matrix.item_ids]
+        known = np.array([w is not None for w in weights], dtype=bool)
+        weight = np.array([w if w is not None else 0.0 for w in weights], dtype=np.float64)
+        item_weight = np.where(weight > 0, weight, 0.1)  # Default small weight
+
+        buy_idx = np.array([matrix.city_index[r[0]] for r in routes], dtype=np.intp)
+        sell_idx = np.array([matrix.city_index[r[1]] for r in routes], dtype=np.intp)
+        is_bm = np.array([r[1] in (BLACK_MARKET_CITY_NAME, BLACK_MARKET_CITY_ID) for r in routes], dtype=bool)
+
+        # All arrays below are shaped items × qualities × routes
+        buy_cost = matrix.sell_price[:, :, buy_idx]
+        buy_side_bid = matrix.buy_price[:, :, buy_idx]
+        sell_side_ask = matrix.sell_price[:, :, sell_idx]
+        sell_side_bid = matrix.buy_price[:, :, sell_idx]
+        valid = matrix.present[:, :, buy_idx] & matrix.present[:, :, sell_idx] & known[:, None, None]
+        valid &= (buy_side_bid != 0) & (sell_side_ask != 0)
+
+        # Black Market uses buy_price_max, which is what we sell to the BM for
+        sell_price = np.where(is_bm, sell_side_bid, sell_side_ask)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            unit_profit = (sell_price * (1 - self.engine.tax_rate)) - buy_cost
+            unit_profit = np.where(is_bm, unit_profit * (1 - BLACK_MARKET_TRASH_RATE), unit_profit)
+            positive_cost = buy_cost > 0
+            roi = np.where(positive_cost, unit_profit / buy_cost, 0.0)
+            spread = np.where(positive_cost, (sell_price - buy_cost) / buy_cost, 0.0)
+
+        keep = valid & (roi >= MIN_ROI_PERCENTAGE) & (spread >= MIN_SPREAD_PERCENTAGE)
+        i_idx, q_idx, r_idx = np.nonzero(keep)
+        if len(i_idx) == 0:
+            return []
+
+        survivor_weight = item_weight[i_idx]
+        survivor_profit = unit_profit[i_idx, q_idx, r_idx]
+        trip_profit = np.floor(MOUNT_CAPACITY / survivor_weight) * survivor_profit
+        silver_per_kg = survivor_profit / survivor_weight
+
+        # Like the scalar engine, a trade is as recent as the later of its two quotes
+        observed = np.maximum(matrix.observed[:, :, buy_idx], matrix.observed[:, :, sell_idx])[i_idx, q_idx, r_idx]
+        timestamps = matrix.timestamps
+        trades = [
+            Trade(
+                item_id=matrix.item_ids[i],
+                quality=matrix.qualities[q],
+                city_buy=routes[r][0],
+                city_sell=routes[r][1],
+                buy_price=bp,
+                sell_price=sp,
+                unit_profit=up,
+                roi=ro,
+                trip_profit=tp,
+                silver_per_kg=spk,
+                timestamp=timestamps[o]
+            )
+            for i, q, r, bp, sp, up, ro, tp, spk, o in zip(
+                i_idx.tolist(), q_idx.tolist(), r_idx.tolist(),
+                buy_cost[i_idx, q_idx, r_idx].tolist(),
+                sell_price[i_idx, q_idx, r_idx].tolist(),
+                survivor_profit.tolist(),
+                roi[i_idx, q_idx, r_idx].tolist(),
+                trip_profit.tolist(),
+                silver_per_kg.tolist(),
+                observed.tolist()
+            )
+        ]
+        logging.debug(f"Vector kernel evaluated {keep.size} candidates, {len(trades)} passed.")
+        return trades
+
+    def calculate_trades_scalar(self, prices: Iterable[Price], item_resolver: Callable[[str], Optional[Item]],
+                                routes: Iterable[Tuple[str, str]]) -> List[Trade]:
+        """Reference path (and fallback without numpy) that calls the scalar engine per pair."""
+        price_map: Dict[Tuple[str, int], Dict[str, Price]] = {}
+        for price in prices:
+            price_map.setdefault((price.item_id, price.quality), {})[price.city] = price
+
+        routes = list(routes)
+        trades = []
+        for (item_id, quality), cities in price_map.items():
+            item = item_resolver(item_id)
+            if item is None:
+                continue
+            for city_buy, city_sell in routes:
+                if city_buy in cities and city_sell in cities:
+                    trade = self.engine.calculate_trade(item, cities[city_buy], cities[city_sell])
+                    if trade:
+                        trades.append(trade)
+        return trades
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None
@@ -1,11 +1,13 @@
 
 import customtkinter
+import dataclasses
 import threading
 import logging
+import queue
 import sys
 import os
 from concurrent.futures import ThreadPoolExecutor
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING
 
 # Add the project root to the Python path to resolve local imports
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -13,16 +15,14 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from ui.table_view import TableView
-from services.api_client import APIClient
-from services.arbitrage_engine import ArbitrageEngine
-from services.notification_service import NotificationService
+from ui.trade_table_model import TradeTableModel
 from data.metadata_loader import MetadataLoader
-from data.flip_loader import FlipLoader
-from database.db_manager import DatabaseManager
-from models.item import Item
-from models.price import Price
-from models.trade import Trade
-from datetime import datetime
+from config.constants import MARKET_CITIES, BLACK_MARKET_CITY_NAME, SCAN_QUALITIES, UI_QUEUE_POLL_MS, METRICS_EXPORT_PATH
+from utils.startup_profile import profiler
+from utils.metrics import metrics
+# Services (requests, sqlite, worker threads) are imported and built off the Tk thread in build_services()
+if TYPE_CHECKING:
+    from services.scan_pipeline import BatchResult
 
 class MainWindow(customtkinter.CTk):
     def __init__(self):
@@ -30,13 +30,14 @@ class MainWindow(customtkinter.CTk):
         self.title("Albion Market Master - Europe Server")
         self.geometry("1200x800")
 
-        # Initialization
+        # Initialization: only what the window needs to draw; everything else comes from build_services()
         self.metadata_loader = MetadataLoader()
-        self.flip_loader = FlipLoader()
-        self.db_manager = DatabaseManager()
-        self.api_client = APIClient()
-        self.arbitrage_engine = ArbitrageEngine()
-        self.notification_service = NotificationService()
+        self.services_ready = threading.Event()
+        self.refresh_unlocked = False
+        self.startup_done = False
+        # Worker threads never touch widgets; they post here and the Tk thread polls
+        self.ui_queue: queue.Queue = queue.Queue()
+        self.trade_model = TradeTableModel(self.metadata_loader.get_item_name, self.metadata_loader.get_item_tier)
         self.executor = ThreadPoolExecutor(max_workers=5)
 
         # Configure grid layout
@@ -46,18 +47,53 @@ class MainWindow(customtkinter.CTk):
         # Sidebar
         self.sidebar_frame = customtkinter.CTkFrame(self, width=140, corner_radius=0)
         self.sidebar_frame.grid(row=0, column=0, sticky="nsew")
-        self.sidebar_frame.grid_rowconfigure(4, weight=1)
+        self.sidebar_frame.grid_rowconfigure(5, weight=1)
         
         self.logo_label = customtkinter.CTkLabel(self.sidebar_frame, text="Albion MM", font=customtkinter.CTkFont(size=20, weight="bold"))
         self.logo_label.grid(row=0, column=0, padx=20, pady=20)
 
-        self.refresh_button = customtkinter.CTkButton(self.sidebar_frame, text="Refresh Data", command=self.start_refresh)
+        # Enabled by poll_ui_queue once the services exist and at least part of the item index is loaded
+        self.refresh_button = customtkinter.CTkButton(self.sidebar_frame, text="Refresh Data", command=self.start_refresh, state="disabled")
         self.refresh_button.grid(row=1, column=0, padx=20, pady=10)
 
         self.progress_bar = customtkinter.CTkProgressBar(self.sidebar_frame)
         self.progress_bar.grid(row=2, column=0, padx=20, pady=10)
         self.progress_bar.set(0)
 
+        # Filters, answered from the trade model's raw values
+        self.filter_frame = customtkinter.CTkFrame(self.sidebar_frame, fg_color="transparent")
+        self.filter_frame.grid(row=3, column=0, padx=20, pady=10, sticky="ew")
+
+        customtkinter.CTkLabel(self.filter_frame, text="Min ROI (%)").grid(row=0, column=0, sticky="w")
+        self.min_roi_entry = customtkinter.CTkEntry(self.filter_frame, width=100)
+        self.min_roi_entry.grid(row=1, column=0, pady=(0, 5), sticky="ew")
+        self.min_roi_entry.bind("<Return>", lambda e: self.apply_filters())
+
+        customtkinter.CTkLabel(self.filter_frame, text="Min Unit Profit").grid(row=2, column=0, sticky="w")
+        self.min_profit_entry = customtkinter.CTkEntry(self.filter_frame, width=100)
+        self.min_profit_entry.grid(row=3, column=0, pady=(0, 5), sticky="ew")
+        self.min_profit_entry.bind("<Return>", lambda e: self.apply_filters())
+
+        customtkinter.CTkLabel(self.filter_frame, text="Tier").grid(row=4, column=0, sticky="w")
+        self.tier_menu = customtkinter.CTkOptionMenu(self.filter_frame, values=["All"] + [str(t) for t in range(1, 9)],
+                                                     command=lambda _: self.apply_filters())
+        self.tier_menu.grid(row=5, column=0, pady=(0, 5), sticky="ew")
+
+        customtkinter.CTkLabel(self.filter_frame, text="City").grid(row=6, column=0, sticky="w")
+        self.city_menu = customtkinter.CTkOptionMenu(self.filter_frame, values=["All"] + MARKET_CITIES + [BLACK_MARKET_CITY_NAME],
+                                                     command=lambda _: self.apply_filters())
+        self.city_menu.grid(row=7, column=0, pady=(0, 5), sticky="ew")
+
+        self.auto_refresh_switch = customtkinter.CTkSwitch(self.sidebar_frame, text="Auto Refresh", command=self.toggle_auto_refresh, state="disabled")
+        self.auto_refresh_switch.grid(row=4, column=0, padx=20, pady=10, sticky="w")
+
+        self.status_label = customtkinter.CTkLabel(self.sidebar_frame, text="Loading...", anchor="w")
+        self.status_label.grid(row=6, column=0, padx=20, pady=10, sticky="ew")
+
+        self.stats_button = customtkinter.CTkButton(self.sidebar_frame, text="Stats", command=self.open_stats_panel)
+        self.stats_button.grid(row=7, column=0, padx=20, pady=(0, 20))
+        self.stats_panel = None
+
         # Main View
         self.main_frame = customtkinter.CTkFrame(self, corner_radius=0)
         self.main_frame.grid(row=0, column=1, sticky="nsew")
@@ -66,128 +102,206 @@ class MainWindow(customtkinter.CTk):
 
         self.table_view = TableView(self.main_frame)
         self.table_view.grid(row=0, column=0, sticky="nsew", padx=20, pady=20)
+        self.table_view.set_sort_callback(self.sort_table)
+        self.table_view.set_heading_texts(self.trade_model.heading_text)
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(UI_QUEUE_POLL_MS, self.poll_ui_queue)
+        self.after_idle(lambda: profiler.mark("window shown"))
 
         # Start background sync
         threading.Thread(target=self.initial_sync, daemon=True).start()
 
+    def build_services(self):
+        """Imports and constructs the network, database and compute services. Runs off the Tk thread."""
+        try:
+            self._build_services()
+        except Exception as e:
+            logging.error(f"Failed to start services: {e}")
+
+    def _build_services(self):
+        with profiler.phase("import services"):
+            from services.api_client import APIClient
+            from services.price_cache import PriceCache
+            from services.arbitrage_engine import ArbitrageEngine
+            from services.incremental_engine import IncrementalArbitrageEngine
+            from services.route_engine import RouteEngine
+            from services.scan_pipeline import ScanPipeline
+            from services.refresh_scheduler import RefreshScheduler
+            from services.notification_service import NotificationService
+            from data.flip_loader import FlipLoader
+            from database.db_manager import DatabaseManager
+            from database.price_history import PriceHistoryStore
+            from database.write_behind import WriteBehindQueue
+
+        with profiler.phase("build services"):
+            self.flip_loader = FlipLoader()
+            self.db_manager = DatabaseManager()
+            self.price_history = PriceHistoryStore(self.db_manager)
+            self.write_behind = WriteBehindQueue(self.db_manager, self.price_history)
+            self.api_client = APIClient(cache=PriceCache())
+            self.arbitrage_engine = ArbitrageEngine()
+            self.route_engine = RouteEngine(self.arbitrage_engine, self.flip_loader)
+            self.incremental_engine = IncrementalArbitrageEngine(self.arbitrage_engine, self.metadata_loader.build_item)
+            self.notification_service = NotificationService()
+            self.scan_pipeline = ScanPipeline(self.api_client, self.incremental_engine, self.price_history,
+                                              self.write_behind, self.notification_service)
+            self.refresh_scheduler = RefreshScheduler(self.scan_pipeline, self.metadata_loader.get_bm_eligible_items,
+                                                      self.route_engine.locations, SCAN_QUALITIES, self.on_scheduled_result)
+            self.flip_loader.load_flips()
+            self.incremental_engine.set_routes(self.route_engine.routes())
+        self.services_ready.set()
+
     def initial_sync(self):
-        """Runs at startup to sync metadata and flips."""
-        self.metadata_loader.sync_metadata()
-        self.flip_loader.load_flips()
-        self.db_manager.purge_old_data()
-        logging.info("Initial sync completed.")
+        """Runs at startup: services and metadata load side by side, then housekeeping."""
+        services_thread = threading.Thread(target=self.build_services, name="build-services", daemon=True)
+        services_thread.start()
+        try:
+            with profiler.phase("metadata"):
+                # Publishes partial indexes while items.json is parsed; see MetadataLoader._load_metadata
+                self.metadata_loader.sync_metadata()
+            profiler.mark("metadata loaded")
+            services_thread.join()
+            if not self.services_ready.is_set():
+                return
+            with profiler.phase("housekeeping"):
+                self.db_manager.purge_old_data()
+                self.price_history.downsample()
+            logging.info("Initial sync completed.")
+        except Exception as e:
+            logging.error(f"Initial sync failed: {e}")
+        finally:
+            profiler.report()
 
     def start_refresh(self):
         """Starts the price refresh process in a separate thread."""
         self.refresh_button.configure(state="disabled")
+        self.progress_bar.set(0)
         threading.Thread(target=self.refresh_data, daemon=True).start()
 
     def refresh_data(self):
-        """Fetches new prices and updates the table."""
+        """Fetches new prices and streams each batch's trade changes to the UI queue."""
         try:
-            # Example: Fetching a subset of items for demonstration
-            # In a real scenario, this would be more comprehensive
-            item_ids = list(self.metadata_loader.items.keys())[:500] # Limit for demo
-            locations = ["Thetford", "Lymhurst", "Bridgewatch", "Martlock", "Fort Sterling", "Caerleon", "Black Market"]
-            qualities = [1, 2, 3]
-
-            all_trades = []
-            batch_size = 200
-            total_batches = (len(item_ids) + batch_size - 1) // batch_size
-
-            for i in range(0, len(item_ids), batch_size):
-                batch = item_ids[i:i + batch_size]
-                self.progress_bar.set((i / len(item_ids)))
-                
-                prices_data = self.api_client.fetch_prices(batch, locations, qualities)
-                
-                # Process prices and calculate trades
-                trades = self.process_prices(prices_data)
-                all_trades.extend(trades)
-
-            # Update UI in main thread
-            self.after(0, lambda: self.update_ui(all_trades))
+            # Only items the Black Market buys are worth a request
+            item_ids = self.metadata_loader.get_bm_eligible_items()
+            locations = self.route_engine.locations()
+
+            for result in self.scan_pipeline.scan(item_ids, locations, SCAN_QUALITIES):
+                self.ui_queue.put(result)
             
         except Exception as e:
             logging.error(f"Error during refresh: {e}")
         finally:
-            self.after(0, lambda: self.refresh_button.configure(state="normal"))
-            self.after(0, lambda: self.progress_bar.set(1))
-
-    def process_prices(self, prices_data: List[Dict]) -> List[Trade]:
-        """Processes raw API data and returns a list of profitable trades."""
-        trades = []
-        # Group prices by item and quality for easier comparison
-        price_map = {}
-        for p in prices_data:
-            key = (p["item_id"], p["quality"])
-            if key not in price_map:
-                price_map[key] = {}
-            price_map[key][p["city"]] = Price(
-                item_id=p["item_id"],
-                quality=p["quality"],
-                city=p["city"],
-                sell_price=p["sell_price_min"],
-                buy_price=p["buy_price_max"], # sell_price_max is also available
-                avg_24h=0, # Not provided in this API call
-                timestamp=datetime.now()
-            )
-
-        # Calculate arbitrage for each item/quality
-        for (item_id, quality), cities_prices in price_map.items():
-            item_info = self.metadata_loader.get_item_info(item_id)
-            if not item_info:
-                continue
-            
-            item_obj = Item(
-                item_id=item_id,
-                item_name=item_info["LocalizedName"] or item_id,
-                item_type=item_info["Category"],
-                weight=item_info["Weight"],
-                tier=item_info["Tier"],
-                enchantment=0, # Simplified
-                max_stack_size=1,
-                craftable=True,
-                salvageable=True,
-                equipable=True
-            )
-
-            # Check flips (City -> Black Market)
-            if "Black Market" in cities_prices:
-                sell_price_info = cities_prices["Black Market"]
-                for city, buy_price_info in cities_prices.items():
-                    if city == "Black Market":
-                        continue
-                    
-                    trade = self.arbitrage_engine.calculate_trade(item_obj, buy_price_info, sell_price_info)
-                    if trade:
-                        trades.append(trade)
-                        self.notification_service.notify_trade(trade)
-        
-        return trades
-
-    def update_ui(self, trades: List[Trade]):
-        """Updates the table with the new trade data."""
-        table_data = []
-        for t in trades:
-            item_info = self.metadata_loader.get_item_info(t.item_id)
-            item_name = item_info["LocalizedName"] if item_info else t.item_id
-            table_data.append((
-                item_name,
-                t.quality,
-                t.city_buy,
-                t.city_sell,
-                f"{t.buy_price:,}",
-                f"{t.sell_price:,}",
-                f"{t.unit_profit:,.0f}",
-                f"{t.roi:.2%}",
-                f"{t.trip_profit:,.0f}",
-                f"{t.silver_per_kg:,.2f}"
-            ))
-        
-        # Sort by ROI descending
-        table_data.sort(key=lambda x: float(x[7].strip('%')), reverse=True)
-        self.table_view.update_table(table_data)
+            self.ui_queue.put(None)  # End of refresh
+
+    def toggle_auto_refresh(self):
+        if self.auto_refresh_switch.get():
+            self.refresh_scheduler.start()
+        else:
+            # Joining would block the Tk thread until the batch in flight finishes
+            self.refresh_scheduler.stop(timeout=0)
+
+    def on_scheduled_result(self, result: "BatchResult"):
+        # Scheduled cycles only patch the table; the progress bar belongs to manual refreshes
+        self.ui_queue.put(dataclasses.replace(result, items_done=0, items_total=0))
+
+    def poll_ui_queue(self):
+        """Drains streamed scan results on the Tk thread, redrawing the table at most once per poll."""
+        changed = False
+        try:
+            while True:
+                result = self.ui_queue.get_nowait()
+                if result is None:
+                    self.refresh_button.configure(state="normal")
+                    self.progress_bar.set(1)
+                    continue
+                if result.diff:
+                    self.trade_model.upsert(result.diff.added + result.diff.updated)
+                    self.trade_model.remove(result.diff.removed)
+                    changed = True
+                if result.items_total:
+                    self.progress_bar.set(result.items_done / result.items_total)
+        except queue.Empty:
+            pass
+
+        if changed:
+            self.show_trades()
+        if not self.startup_done:
+            self.update_startup_state()
+        self.after(UI_QUEUE_POLL_MS, self.poll_ui_queue)
+
+    def update_startup_state(self):
+        """Enables refreshing as soon as services exist and some items are indexed, and shows load progress."""
+        item_count = len(self.metadata_loader.items)
+        if not self.services_ready.is_set():
+            self.status_label.configure(text="Starting services...")
+            return
+        if not item_count:
+            self.status_label.configure(text="Loading items...")
+            return
+
+        if not self.refresh_unlocked:
+            self.refresh_unlocked = True
+            self.refresh_button.configure(state="normal")
+            self.auto_refresh_switch.configure(state="normal")
+            profiler.mark("refresh ready")
+        if self.metadata_loader.loaded.is_set():
+            self.startup_done = True
+            self.status_label.configure(text=f"{item_count:,} items")
+        else:
+            # A refresh now scans the items indexed so far
+            self.status_label.configure(text=f"Loading items... {item_count:,}")
+
+    def show_trades(self):
+        """Pushes the model's filtered, sorted keys to the table; only displayed rows get formatted."""
+        with metrics.timer("ui_show_trades_seconds"):
+            self.table_view.set_keys(self.trade_model.visible_keys(), self.trade_model.format_row)
+
+    def open_stats_panel(self):
+        if self.stats_panel is not None and self.stats_panel.winfo_exists():
+            self.stats_panel.focus()
+            return
+        from ui.stats_panel import StatsPanel
+        self.stats_panel = StatsPanel(self)
+
+    def sort_table(self, column: str):
+        self.trade_model.sort_by(column)
+        self.table_view.set_heading_texts(self.trade_model.heading_text)
+        self.show_trades()
+
+    def apply_filters(self):
+        """Reads the sidebar filter widgets into the trade model."""
+        def parse(entry, scale=1.0):
+            try:
+                return float(entry.get().replace(",", ".")) * scale
+            except ValueError:
+                return None
+
+        tier = self.tier_menu.get()
+        city = self.city_menu.get()
+        self.trade_model.set_filters(
+            min_roi=parse(self.min_roi_entry, 0.01),
+            min_profit=parse(self.min_profit_entry),
+            tier=None if tier == "All" else int(tier),
+            city=None if city == "All" else city
+        )
+        self.show_trades()
+
+    def on_close(self):
+        """Flushes pending writes and releases connections before closing the window."""
+        if self.services_ready.is_set():
+            self.refresh_scheduler.stop(timeout=5)
+            self.notification_service.close(timeout=5)
+            self.write_behind.close()
+            self.api_client.close()
+            self.price_history.close()
+            self.db_manager.close()
+        if metrics.enabled:
+            try:
+                metrics.export(METRICS_EXPORT_PATH)
+            except OSError as e:
+                logging.error(f"Failed to export metrics: {e}")
+        self.destroy()
 
     def change_appearance_mode_event(self, new_appearance_mode: str):
         customtkinter.set_appearance_mode(new_appearance_mode)
@@ -0,0 +1,49 @@
+import customtkinter
+import logging
+from config.constants import METRICS_EXPORT_PATH, METRICS_PANEL_REFRESH_MS
+from utils.metrics import metrics
+
+class StatsPanel(customtkinter.CTkToplevel):
+    """Live view of the metrics registry: stage latencies, counters and the last refresh breakdown."""
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.title("Performance Stats")
+        self.geometry("560x520")
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.textbox = customtkinter.CTkTextbox(self, font=customtkinter.CTkFont(family="Courier", size=12))
+        self.textbox.grid(row=0, column=0, columnspan=2, sticky="nsew", padx=10, pady=10)
+
+        self.export_button = customtkinter.CTkButton(self, text="Export", command=self.export)
+        self.export_button.grid(row=1, column=0, padx=10, pady=(0, 10), sticky="w")
+
+        self.status_label = customtkinter.CTkLabel(self, text="" if metrics.enabled else "Metrics are disabled.", anchor="e")
+        self.status_label.grid(row=1, column=1, padx=10, pady=(0, 10), sticky="e")
+
+        self._refresh_job = None
+        self.refresh()
+
+    def refresh(self):
+        """Redraws the summary and reschedules itself while the panel is open."""
+        self.textbox.configure(state="normal")
+        self.textbox.delete("1.0", "end")
+        self.textbox.insert("1.0", "\n".join(metrics.summary_lines()))
+        self.textbox.configure(state="disabled")
+        self._refresh_job = self.after(METRICS_PANEL_REFRESH_MS, self.refresh)
+
+    def export(self):
+        try:
+            metrics.export(METRICS_EXPORT_PATH)
+            self.status_label.configure(text=f"Exported to {METRICS_EXPORT_PATH}")
+        except OSError as e:
+            logging.error(f"Failed to export metrics: {e}")
+            self.status_label.configure(text="Export failed.")
+
+    def destroy(self):
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        super().destroy()
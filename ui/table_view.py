@@ -1,9 +1,21 @@
-
 import customtkinter
 import tkinter as tk
 from tkinter import ttk
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from config.constants import TABLE_VIRTUAL_THRESHOLD, TABLE_BUFFER_ROWS, TABLE_UPDATE_CHUNK_SIZE, TABLE_ROW_HEIGHT
+from utils.metrics import metrics
 
 class TableView(customtkinter.CTkFrame):
+    """Trade table that applies row diffs and, for large result sets, renders only a window.
+
+    Rows are keyed (e.g. by item, quality and route) so a refresh only inserts, updates,
+    moves or removes the rows that changed. Values come from a formatter that is only
+    called for rows in the rendered window. Above TABLE_VIRTUAL_THRESHOLD rows the
+    Treeview holds just the visible rows plus TABLE_BUFFER_ROWS on each side, and the
+    scrollbar is driven from the full model. Treeview work is split across after()
+    ticks so the UI never stalls on a big update.
+    """
+
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
 
@@ -38,18 +50,187 @@ class TableView(customtkinter.CTkFrame):
         self.tree.column("Silver/KG", width=90, anchor=tk.E)
 
         # Add a scrollbar
-        scrollbar = customtkinter.CTkScrollbar(self, orientation="vertical", command=self.tree.yview)
-        scrollbar.grid(row=0, column=1, sticky="ns")
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.scrollbar = customtkinter.CTkScrollbar(self, orientation="vertical", command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+
+        # Full row model: ordered keys plus the formatter producing their display values
+        self.keys: List[Hashable] = []
+        self.formatter: Callable[[Hashable], Tuple] = lambda key: ()
+        self.on_sort: Optional[Callable[[str], None]] = None
+        self.offset = 0  # Index of the first visible row in self.keys
+        self.window_start = 0
+        self.window_end = 0
+
+        # Treeview state as it will be once the pending chunked operations are applied
+        self.iids: Dict[Hashable, str] = {}
+        self.rendered_values: Dict[str, Tuple] = {}
+        self.rendered_order: List[Hashable] = []
+        self._next_iid = 0
+        self._pending_ops: List[Tuple] = []
+        self._drain_job = None
+
+        self.tree.bind("<Configure>", lambda e: self._render() if self.virtual else None)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_rows(3))
+
+    @property
+    def virtual(self) -> bool:
+        return len(self.keys) > TABLE_VIRTUAL_THRESHOLD
+
+    def set_sort_callback(self, on_sort: Callable[[str], None]):
+        """Makes every heading clickable; on_sort receives the column name."""
+        self.on_sort = on_sort
+        for column in self.tree["columns"]:
+            self.tree.heading(column, command=lambda c=column: self.on_sort(c))
+
+    def set_heading_texts(self, text_of: Callable[[str], str]):
+        for column in self.tree["columns"]:
+            self.tree.heading(column, text=text_of(column))
 
     def update_table(self, data):
-        # Clear existing data
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        """Replaces the table contents with plain value tuples, keyed by their first four columns."""
+        self.set_rows((tuple(row[:4]), tuple(row)) for row in data)
+
+    def set_rows(self, rows: Iterable[Tuple[Hashable, Tuple]]):
+        """Replaces the model with ordered (key, values) rows and applies only the differences."""
+        values = {}
+        keys = []
+        for key, row in rows:
+            keys.append(key)
+            values[key] = row
+        self.set_keys(keys, values.__getitem__)
+
+    def set_keys(self, keys: List[Hashable], formatter: Callable[[Hashable], Tuple]):
+        """Replaces the model with ordered keys whose values are formatted lazily."""
+        self.keys = keys
+        self.formatter = formatter
+        self.offset = min(self.offset, max(0, len(self.keys) - 1))
+        self._render()
+
+    def _visible_rows(self) -> int:
+        height = self.tree.winfo_height()
+        # Before the first layout pass the height is 1; assume a typical window
+        return max(10, height // TABLE_ROW_HEIGHT - 1) if height > 1 else 40
+
+    def _render(self):
+        """Diffs the rows that should be in the Treeview against what is there and queues the operations."""
+        with metrics.timer("ui_render_seconds"):
+            self._queue_render_ops()
+        # A drain already in progress picks up the new operations on its next tick
+        if self._drain_job is None:
+            self._drain()
+
+    def _queue_render_ops(self):
+        # Diffs against the queued state, so operations still pending from an earlier render stay valid
+        if self.virtual:
+            visible = self._visible_rows()
+            self.offset = max(0, min(self.offset, len(self.keys) - visible))
+            self.window_start = max(0, self.offset - TABLE_BUFFER_ROWS)
+            self.window_end = min(len(self.keys), self.offset + visible + TABLE_BUFFER_ROWS)
+        else:
+            self.window_start, self.window_end = 0, len(self.keys)
+        desired = self.keys[self.window_start:self.window_end]
+        desired_set = set(desired)
+
+        ops: List[Tuple] = []
+        for key in [k for k in self.iids if k not in desired_set]:
+            iid = self.iids.pop(key)
+            self.rendered_values.pop(iid, None)
+            ops.append(("delete", iid))
+
+        # Rows that stay keep their relative order in the common case; only then can moves be skipped
+        current_order = [k for k in self.rendered_order if k in desired_set]
+        staying_order = [k for k in desired if k in self.iids]
+        needs_move = current_order != staying_order
+
+        for index, key in enumerate(desired):
+            values = self.formatter(key)
+            iid = self.iids.get(key)
+            if iid is None:
+                iid = self.iids[key] = f"r{self._next_iid}"
+                self._next_iid += 1
+                self.rendered_values[iid] = values
+                ops.append(("insert", iid, index, values))
+                continue
+            if self.rendered_values.get(iid) != values:
+                self.rendered_values[iid] = values
+                ops.append(("update", iid, values))
+            if needs_move:
+                ops.append(("move", iid, index))
+
+        self.rendered_order = desired
+        # Applied in order after the earlier operations, so the Treeview still ends up matching desired
+        self._pending_ops.extend(ops)
+
+    def _drain(self):
+        """Applies one chunk of queued Treeview operations and reschedules itself."""
+        self._drain_job = None
+        chunk, self._pending_ops = self._pending_ops[:TABLE_UPDATE_CHUNK_SIZE], self._pending_ops[TABLE_UPDATE_CHUNK_SIZE:]
+        # One chunk is the longest the Tk thread is blocked per tick
+        with metrics.timer("ui_drain_chunk_seconds"):
+            self._apply_ops(chunk)
+
+        if self._pending_ops:
+            self._drain_job = self.after(1, self._drain)
+        else:
+            self._sync_view()
+
+    def _apply_ops(self, ops: List[Tuple]):
+        for op in ops:
+            kind, iid = op[0], op[1]
+            if kind == "delete":
+                if self.tree.exists(iid):
+                    self.tree.delete(iid)
+            elif kind == "insert":
+                self.tree.insert("", op[2], iid=iid, values=op[3])
+            elif kind == "update":
+                self.tree.item(iid, values=op[2])
+            elif kind == "move":
+                self.tree.move(iid, "", op[2])
+
+    def _sync_view(self):
+        """Positions the Treeview on self.offset and updates the scrollbar from the full model."""
+        if not self.virtual:
+            return
+        window = self.window_end - self.window_start
+        if window:
+            self.tree.yview_moveto((self.offset - self.window_start) / window)
+        total = len(self.keys)
+        self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self._visible_rows()) / total))
+
+    def _scroll_rows(self, delta: int):
+        if not self.virtual:
+            self.tree.yview_scroll(delta, "units")
+            return "break"
+        visible = self._visible_rows()
+        self.offset = max(0, min(self.offset + delta, len(self.keys) - visible))
+        # Inside the buffered window only the view moves; otherwise slide the window
+        if self.window_start <= self.offset and self.offset + visible <= self.window_end:
+            self._sync_view()
+        else:
+            self._render()
+        return "break"
+
+    def _on_mousewheel(self, event):
+        return self._scroll_rows(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, *args):
+        if not self.virtual:
+            self.tree.yview(*args)
+            return
+        if args[0] == "moveto":
+            target = int(float(args[1]) * len(self.keys))
+            self._scroll_rows(target - self.offset)
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            self._scroll_rows(amount * self._visible_rows() if args[2] == "pages" else amount)
 
-        # Insert new data
-        for row in data:
-            self.tree.insert("", "end", values=row)
+    def _on_tree_scroll(self, first, last):
+        # In virtual mode the scrollbar reflects the full model, not the rendered window
+        if not self.virtual:
+            self.scrollbar.set(first, last)
 
 if __name__ == "__main__":
     app = customtkinter.CTk()
@@ -0,0 +1,120 @@
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from models.trade import Trade
+
+TradeKey = Tuple[str, int, str, str]  # (item_id, quality, city_buy, city_sell)
+
+# (heading, formatter) per displayed column; the raw sort value lives at the same index in each row
+COLUMNS: List[Tuple[str, Callable]] = [
+    ("Item", str),
+    ("Quality", str),
+    ("City Buy", str),
+    ("City Sell", str),
+    ("Buy Price", lambda v: f"{v:,}"),
+    ("Sell Price", lambda v: f"{v:,}"),
+    ("Unit Profit", lambda v: f"{v:,.0f}"),
+    ("ROI", lambda v: f"{v:.2%}"),
+    ("Trip Profit", lambda v: f"{v:,.0f}"),
+    ("Silver/KG", lambda v: f"{v:,.2f}"),
+]
+COLUMN_INDEX = {name: i for i, (name, _) in enumerate(COLUMNS)}
+ROI_COLUMN = COLUMN_INDEX["ROI"]
+PROFIT_COLUMN = COLUMN_INDEX["Unit Profit"]
+
+class TradeTableModel:
+    """Backing model for the trade table: raw values, sorting, filtering and lazy formatting.
+
+    Each trade is stored once as a tuple of raw column values, which doubles as the
+    precomputed sort key for every column. Filters and sorting run on those tuples;
+    strings are only produced by format_row() for the rows the view actually shows.
+    """
+
+    def __init__(self, name_of: Callable[[str], str], tier_of: Callable[[str], int]):
+        self.name_of = name_of
+        self.tier_of = tier_of
+        self.rows: Dict[TradeKey, tuple] = {}
+        self.tiers: Dict[TradeKey, int] = {}
+
+        self.sort_column = ROI_COLUMN
+        self.sort_descending = True
+
+        self.min_roi: Optional[float] = None
+        self.min_profit: Optional[float] = None
+        self.tier: Optional[int] = None
+        self.city: Optional[str] = None
+        self._view: Optional[List[TradeKey]] = None
+
+    @staticmethod
+    def key_of(trade: Trade) -> TradeKey:
+        return (trade.item_id, trade.quality, trade.city_buy, trade.city_sell)
+
+    def _raw_row(self, trade: Trade) -> tuple:
+        name = self.name_of(trade.item_id) or trade.item_id
+        return (name, trade.quality, trade.city_buy, trade.city_sell, trade.buy_price, trade.sell_price,
+                trade.unit_profit, trade.roi, trade.trip_profit, trade.silver_per_kg)
+
+    def set_trades(self, trades: Iterable[Trade]):
+        """Replaces every row."""
+        self.rows.clear()
+        self.tiers.clear()
+        self.upsert(trades)
+
+    def upsert(self, trades: Iterable[Trade]):
+        for trade in trades:
+            key = self.key_of(trade)
+            self.rows[key] = self._raw_row(trade)
+            if key not in self.tiers:
+                self.tiers[key] = self.tier_of(trade.item_id)
+        self._view = None
+
+    def remove(self, trades: Iterable[Trade]):
+        for trade in trades:
+            key = self.key_of(trade)
+            self.rows.pop(key, None)
+            self.tiers.pop(key, None)
+        self._view = None
+
+    def set_filters(self, min_roi: Optional[float] = None, min_profit: Optional[float] = None,
+                    tier: Optional[int] = None, city: Optional[str] = None):
+        """Sets every filter at once; None disables a filter. `city` matches either end of a route."""
+        self.min_roi, self.min_profit, self.tier, self.city = min_roi, min_profit, tier, city
+        self._view = None
+
+    def sort_by(self, column: str):
+        """Sorts by a column heading; choosing the current column again flips the direction."""
+        index = COLUMN_INDEX[column]
+        if index == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            # Numbers read best largest first, text alphabetically
+            self.sort_column = index
+            self.sort_descending = index >= COLUMN_INDEX["Buy Price"]
+        self._view = None
+
+    def visible_keys(self) -> List[TradeKey]:
+        """Filtered and sorted row keys, cached until the rows, filters or sort change."""
+        if self._view is None:
+            self._view = [key for key, row in self.rows.items() if self._matches(key, row)]
+            sort_value = itemgetter(self.sort_column)
+            self._view.sort(key=lambda key: sort_value(self.rows[key]), reverse=self.sort_descending)
+        return self._view
+
+    def _matches(self, key: TradeKey, row: tuple) -> bool:
+        if self.min_roi is not None and row[ROI_COLUMN] < self.min_roi:
+            return False
+        if self.min_profit is not None and row[PROFIT_COLUMN] < self.min_profit:
+            return False
+        if self.tier is not None and self.tiers.get(key) != self.tier:
+            return False
+        if self.city is not None and self.city not in (key[2], key[3]):
+            return False
+        return True
+
+    def format_row(self, key: TradeKey) -> tuple:
+        """Display strings for one row."""
+        return tuple(fmt(value) for (_, fmt), value in zip(COLUMNS, self.rows[key]))
+
+    def heading_text(self, column: str) -> str:
+        if COLUMN_INDEX[column] != self.sort_column:
+            return column
+        return f"{column} {'▼' if self.sort_descending else '▲'}"
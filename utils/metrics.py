@@ -0,0 +1,236 @@
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, List, Optional
+from config.constants import METRICS_ENABLED, METRICS_SPAN_HISTORY
+
+# Latency bucket upper bounds in seconds, from a fast SQLite statement to a slow API call with retries
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# The span that timings recorded in this context belong to
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("metrics_span", default=None)
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the max for the +Inf bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+class Span:
+    """One refresh (or other unit of work) and what was recorded on its behalf.
+
+    While a span is open it is the current span of its context, and every timing or
+    counter recorded in that context is added to it as well. Worker threads join
+    the span by running their work in a copy of the context (see MetricsRegistry.bind).
+    Concurrent refreshes therefore keep separate breakdowns, and work from other
+    threads, such as write-behind flushes, is not charged to them.
+    """
+
+    def __init__(self, registry: "MetricsRegistry", name: str):
+        self.registry = registry
+        self.name = name
+        self.started = time.monotonic()
+        self.seconds: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self._token = _current_span.set(self)
+
+    def finish(self) -> "Span":
+        if self.seconds is not None:
+            return self
+        self.seconds = time.monotonic() - self.started
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Finished from another context (e.g. a generator closed by the garbage collector)
+            pass
+        self.registry._record_span(self)
+        return self
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "seconds": self.seconds, "stages": dict(self.stages), "counters": dict(self.counters)}
+
+class _NullContext:
+    """Shared no-op context manager handed out while metrics are off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_CONTEXT = _NullContext()
+
+class MetricsRegistry:
+    """Process-wide counters, latency histograms and spans.
+
+    Every recording call starts with a check of `enabled`, so turned off the cost is a
+    function call and an attribute read. Metric names follow Prometheus conventions
+    (`_total` for counters, `_seconds` for latencies).
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, span_history: int = METRICS_SPAN_HISTORY):
+        self.enabled = enabled
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.spans: Deque[Span] = deque(maxlen=span_history)
+        self.lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        span = _current_span.get()
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            if span is not None and span.seconds is None:
+                span.counters[name] = span.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+        span = _current_span.get()
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+            if span is not None and span.seconds is None:
+                span.stages[name] = span.stages.get(name, 0.0) + seconds
+
+    def timer(self, name: str):
+        """Context manager observing the wall time of its block into histogram `name`."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._timer(name)
+
+    @contextmanager
+    def _timer(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def start_span(self, name: str) -> Optional[Span]:
+        """Starts a span and makes it current in this context; finish() it when the work is done.
+
+        None while metrics are off.
+        """
+        if not self.enabled:
+            return None
+        return Span(self, name)
+
+    @staticmethod
+    def bind(fn: Callable) -> Callable:
+        """Wraps fn to run in a copy of the caller's context, so a worker thread records into the caller's span."""
+        return _bound(contextvars.copy_context(), fn)
+
+    def _record_span(self, span: Span):
+        with self.lock:
+            self.spans.append(span)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.spans.clear()
+
+    def snapshot(self) -> Dict:
+        """Everything recorded so far as plain data."""
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {name: {
+                    "count": h.count, "sum": h.sum, "max": h.max,
+                    "p50": h.quantile(0.5), "p95": h.quantile(0.95),
+                    "buckets": dict(zip([str(b) for b in h.buckets] + ["+Inf"], h.counts))
+                } for name, h in self.histograms.items()},
+                "spans": [span.to_dict() for span in self.spans]
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix: str = "amm_") -> str:
+        """Prometheus text exposition format (counters and cumulative histograms)."""
+        lines: List[str] = []
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}{name} counter")
+                lines.append(f"{prefix}{name} {value:g}")
+            for name, h in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}{name}_bucket{{le="{bound:g}"}} {cumulative}')
+                lines.append(f'{prefix}{name}_bucket{{le="+Inf"}} {h.count}')
+                lines.append(f"{prefix}{name}_sum {h.sum:.6f}")
+                lines.append(f"{prefix}{name}_count {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str):
+        """Writes Prometheus text for .prom/.txt paths and JSON otherwise, replacing the file atomically."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        content = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        tmp_path = path + ".part"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def summary_lines(self) -> List[str]:
+        """Human-readable summary for the stats panel."""
+        snapshot = self.snapshot()
+        lines = ["Latencies (count, avg, p95, max):"]
+        for name, h in sorted(snapshot["histograms"].items()):
+            avg = h["sum"] / h["count"] if h["count"] else 0.0
+            lines.append(f"  {name}: {h['count']}, {avg * 1000:.1f} ms, {h['p95'] * 1000:.1f} ms, {h['max'] * 1000:.1f} ms")
+        lines.append("Counters:")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"  {name}: {value:g}")
+        # The latest span of each kind, so scheduled cycles do not hide the last manual refresh
+        latest = {span["name"]: span for span in snapshot["spans"]}
+        for span in latest.values():
+            lines.append(f"Last {span['name']}: {span['seconds']:.2f}s")
+            # Stage times are summed across worker threads, so they can exceed the wall time
+            for stage, seconds in sorted(span["stages"].items(), key=lambda kv: kv[1], reverse=True):
+                lines.append(f"  {stage}: {seconds:.3f}s")
+        return lines
+
+def _bound(context: contextvars.Context, fn: Callable) -> Callable:
+    def run(*args, **kwargs):
+        return context.run(fn, *args, **kwargs)
+    return run
+
+# Shared by every instrumented module
+metrics = MetricsRegistry()
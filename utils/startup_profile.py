@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from config.constants import STARTUP_TARGET_SECONDS, STARTUP_PROFILE_NAME
+
+class StartupProfiler:
+    """Records startup phases and milestones relative to the first import of this module.
+
+    phase() measures a block and the modules it imported; mark() records a point in
+    time such as "window shown" or "refresh ready". report() logs a summary, warns when
+    the time to a usable window exceeds STARTUP_TARGET_SECONDS and writes the details
+    as JSON next to the logs. For per-module detail run Python with -X importtime.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases: List[Dict] = []
+        self.marks: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.origin
+
+    def mark(self, name: str):
+        """Records the first time a milestone is reached."""
+        with self.lock:
+            self.marks.setdefault(name, self.elapsed())
+
+    @contextmanager
+    def phase(self, name: str):
+        modules_before = set(sys.modules)
+        started = self.elapsed()
+        try:
+            yield
+        finally:
+            imported = sorted(set(sys.modules) - modules_before)
+            with self.lock:
+                self.phases.append({
+                    "name": name,
+                    "thread": threading.current_thread().name,
+                    "start": round(started, 4),
+                    "seconds": round(self.elapsed() - started, 4),
+                    # Public top-level packages only; submodules and C helpers make the list unreadable.
+                    # Imports made by other threads during the phase are counted too.
+                    "imported": sorted({m.split(".")[0] for m in imported if not m.startswith("_")}),
+                    "modules_imported": len(imported)
+                })
+
+    def report(self, ready_mark: str = "window shown", log_directory: Optional[str] = "logs") -> Dict:
+        with self.lock:
+            report = {
+                "target_seconds": STARTUP_TARGET_SECONDS,
+                "marks": {name: round(t, 4) for name, t in sorted(self.marks.items(), key=lambda kv: kv[1])},
+                "phases": list(self.phases),
+                "modules_loaded": len(sys.modules)
+            }
+
+        for phase in report["phases"]:
+            logging.info(f"Startup phase {phase['name']}: {phase['seconds']:.3f}s, "
+                         f"{phase['modules_imported']} modules ({', '.join(phase['imported'][:8])})")
+        for name, t in report["marks"].items():
+            logging.info(f"Startup mark {name}: {t:.3f}s")
+
+        ready = report["marks"].get(ready_mark)
+        if ready is not None and ready > STARTUP_TARGET_SECONDS:
+            logging.warning(f"Startup time to '{ready_mark}' ({ready:.2f}s) exceeded target ({STARTUP_TARGET_SECONDS}s).")
+
+        if log_directory:
+            try:
+                os.makedirs(log_directory, exist_ok=True)
+                with open(os.path.join(log_directory, STARTUP_PROFILE_NAME), "w", encoding="utf-8") as f:
+                    json.dump(report, f, indent=2)
+            except OSError as e:
+                logging.error(f"Could not write startup profile: {e}")
+        return report
+
+# Shared by every module that takes part in startup
+profiler = StartupProfiler()